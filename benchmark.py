@@ -0,0 +1,174 @@
+"""Offline benchmarks of parsing and the simulations on synthetic decks, with a comparison against a baseline."""
+
+import argparse
+import json
+import platform
+import sys
+import time
+
+import func.probabilities as prob
+from func.cardpool import assignment_verdict
+from func.compiled import compile_deck, shared_verdict_table
+from func.exact import exact_probability, exact_turns
+from func.moxfield import DeckList, PARSED_CARDS
+from func.synthetic import SYNTHETIC_DECKS
+
+# Relative slowdown past which a benchmark is flagged as a regression
+REGRESSION_THRESHOLD = 0.25
+
+# Benchmarks faster than this (in seconds) in the baseline are too noisy to flag
+MIN_FLAGGED_SECONDS = 0.001
+
+
+def parse_arguments(arguments: list = None) -> argparse.Namespace:
+    """
+    Parses the command line arguments.
+    :param arguments: List of arguments. None to read them from sys.argv.
+    :return: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark parsing and the simulations on synthetic decks.")
+    parser.add_argument('-d', '--decks', nargs='*', choices=SYNTHETIC_DECKS, default=list(SYNTHETIC_DECKS),
+                        help="Synthetic decks to benchmark. Default: all.")
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help="Runs of every benchmark, the fastest one counts. Default: 3.")
+    parser.add_argument('-i', '--iterations', type=int, default=2000,
+                        help="Number of games of the Monte Carlo benchmarks. Default: 2000.")
+    parser.add_argument('-o', '--output', default=None, help="Output JSON file. Default: standard output.")
+    parser.add_argument('-b', '--baseline', default=None, help="Baseline JSON file written by an earlier run.")
+    parser.add_argument('-t', '--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help="Relative slowdown flagged as a regression. Default: 0.25.")
+    return parser.parse_args(arguments)
+
+
+def clear_caches():
+    """
+    Clears the parsed cards and the cached verdicts so that every run starts cold.
+    """
+    PARSED_CARDS.clear()
+    shared_verdict_table.cache_clear()
+    assignment_verdict.cache_clear()
+
+
+def measure(function, repeat: int, setup=clear_caches) -> float:
+    """
+    Times a function, the fastest of several runs being the least disturbed by other processes.
+    :param function: Function without arguments.
+    :param repeat: Number of runs.
+    :param setup: Function run, untimed, before every run.
+    :return: The fastest time in seconds.
+    """
+    times = []
+    for _ in range(0, repeat):
+        setup()
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def benchmark_deck(deck_json: dict, repeat: int, iterations: int) -> dict:
+    """
+    Runs every benchmark on one deck. The simulations run in this process so that no pool start-up is timed.
+    :param deck_json: The deck JSON.
+    :param repeat: Runs of every benchmark.
+    :param iterations: Number of games of the Monte Carlo benchmarks.
+    :return: Dict of benchmark name to seconds, per_game benchmarks being the time of one game.
+    """
+    target = [0, 0, 0, 0, 0, 0, 0]
+
+    # Nothing parsed for an earlier deck is reused, so the results don't depend on the order of the decks
+    clear_caches()
+    decklist = DeckList(deck_json=deck_json)
+    deck = compile_deck(decklist)
+    mana_target = deck.get_mana_target()
+
+    results = {
+        'parse': measure(lambda: DeckList(deck_json=deck_json), repeat),
+        'parse_cached': measure(lambda: DeckList(deck_json=deck_json), repeat, setup=lambda: None),
+        'compile': measure(lambda: compile_deck(decklist), repeat),
+        'per_game_probability': measure(lambda: prob.probability_chunk(deck, True, mana_target, iterations, 1),
+                                        repeat) / iterations,
+        'per_game_turns': measure(lambda: prob.turns_chunk(deck, True, mana_target, iterations, 1),
+                                  repeat) / iterations,
+        'per_game_ramp': measure(lambda: prob.ramp_chunk(deck, True, mana_target, True, iterations, 1),
+                                 repeat) / iterations,
+        'probability_simulation': measure(lambda: prob.simulate_probability(iterations, deck, workers=1, seed=1),
+                                          repeat),
+        'turn_count_simulation': measure(lambda: prob.simulate_turns(iterations, deck, workers=1, seed=1), repeat),
+        'exact_probability': measure(lambda: exact_probability(deck), repeat),
+        'exact_turns': measure(lambda: exact_turns(deck), repeat),
+        'probability_simulation_exact': measure(lambda: prob.probability_simulation(deck, target), repeat),
+        'turn_count_simulation_exact': measure(lambda: prob.turn_count_simulation(deck, target), repeat),
+    }
+    return results
+
+
+def run_benchmarks(decks: list, repeat: int = 3, iterations: int = 2000) -> dict:
+    """
+    Runs the benchmarks on synthetic decks.
+    :param decks: Names of synthetic decks, keys of SYNTHETIC_DECKS.
+    :param repeat: Runs of every benchmark.
+    :param iterations: Number of games of the Monte Carlo benchmarks.
+    :return: Dict of the environment, the settings and results (dict of deck name to its benchmarks).
+    """
+    results = {name: benchmark_deck(SYNTHETIC_DECKS[name](), repeat, iterations) for name in decks}
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'repeat': repeat,
+            'iterations': iterations, 'results': results}
+
+
+def compare(results: dict, baseline: dict, threshold: float = REGRESSION_THRESHOLD) -> list:
+    """
+    Compares benchmark results against a baseline. Benchmarks missing from either are skipped.
+    :param results: Results of run_benchmarks.
+    :param baseline: Earlier results of run_benchmarks.
+    :param threshold: Relative slowdown flagged as a regression, e.g. 0.25 for 25 % slower.
+    :return: A list of dicts of deck, benchmark, baseline and current seconds, ratio and regression (bool).
+    """
+    comparisons = []
+    for deck, benchmarks in results['results'].items():
+        for benchmark, seconds in benchmarks.items():
+            baseline_seconds = baseline.get('results', {}).get(deck, {}).get(benchmark)
+            if not baseline_seconds:
+                continue
+            ratio = seconds / baseline_seconds
+            comparisons.append({'deck': deck, 'benchmark': benchmark, 'baseline': baseline_seconds,
+                                'current': seconds, 'ratio': ratio,
+                                'regression': ratio > 1 + threshold and baseline_seconds >= MIN_FLAGGED_SECONDS})
+    return comparisons
+
+
+def main(arguments: list = None) -> int:
+    """
+    Runs the benchmarks, writes the results and compares them against the baseline.
+    :param arguments: List of command line arguments. None to read them from sys.argv.
+    :return: Exit status, 1 if any benchmark regressed.
+    """
+    args = parse_arguments(arguments)
+    results = run_benchmarks(args.decks, args.repeat, args.iterations)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r') as baseline_file:
+            baseline = json.load(baseline_file)
+        if (baseline.get('iterations'), baseline.get('repeat')) != (args.iterations, args.repeat):
+            print("Warning: the baseline was run with other settings.", file=sys.stderr)
+        results['comparison'] = compare(results, baseline, args.threshold)
+        regressions = [comparison for comparison in results['comparison'] if comparison['regression']]
+        for comparison in results['comparison']:
+            flag = ' REGRESSION' if comparison['regression'] else ''
+            print(f"{comparison['deck']:>12} {comparison['benchmark']:<30} {comparison['baseline']:.6f}s -> "
+                  f"{comparison['current']:.6f}s ({comparison['ratio']:.2f}x){flag}", file=sys.stderr)
+
+    output = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        json.dump(results, output, indent=2)
+        output.write('\n')
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,178 @@
+"""Headless command line interface. Runs the simulations on many decks without prompts."""
+
+import argparse
+import csv
+import json
+import os
+import sys
+
+from func.bulk import fetch_decks
+from func.cache import DeckCache
+from func.exceptions import InvalidInputError
+from func.parallel import shared_executor
+from func.pipeline import DECK_ERRORS, result_row, resume_offset, run_pipeline, run_simulation
+from func.query_text import mana_target_from_text
+
+# Simulation modes by their command line name
+MODES = {'probability': 'p', 'turns': 't', 'both': 'b'}
+
+# Columns of the CSV output
+CSV_FIELDS = ['deck', 'names', 'mana_target', 'probability', 'turns', 'error']
+
+
+def parse_arguments(arguments: list = None) -> argparse.Namespace:
+    """
+    Parses the command line arguments.
+    :param arguments: List of arguments. None to read them from sys.argv.
+    :return: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="Simulate hitting your commander's mana on curve for many decks.")
+    parser.add_argument('decks', nargs='*', help="Moxfield deck URLs or paths of deck JSON files.")
+    parser.add_argument('--jsonl', default=None,
+                        help="JSON lines file of deck JSON records, '-' for standard input. "
+                             "The results are streamed as JSON lines in the input order.")
+    parser.add_argument('--start', type=int, default=0, help="Number of the first JSON lines record to process.")
+    parser.add_argument('--resume', action='store_true',
+                        help="Continue an interrupted --jsonl run where its output file ends.")
+    parser.add_argument('-t', '--target', default='',
+                        help="Custom mana target in terms of '#wubrgc', e.g. '2wwr'. Default: commander mana cost.")
+    parser.add_argument('-m', '--mode', choices=MODES, default='both', help="Simulation mode. Default: both.")
+    parser.add_argument('-i', '--iterations', type=int, default=None,
+                        help="Number of Monte Carlo games per deck. Default: exact calculation.")
+    parser.add_argument('-s', '--seed', type=int, default=None, help="Seed of the Monte Carlo simulation.")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="Number of worker processes for the Monte Carlo simulation. Default: one per CPU.")
+    parser.add_argument('-f', '--format', choices=['json', 'csv'], default='json', help="Output format. Default: json.")
+    parser.add_argument('-o', '--output', default=None, help="Output file. Default: standard output.")
+    parser.add_argument('--no-cache', action='store_true', help="Don't read or write the on-disk deck cache.")
+    args = parser.parse_args(arguments)
+    if not args.decks and not args.jsonl:
+        parser.error("give deck URLs or files, or --jsonl")
+    if args.resume and not (args.jsonl and args.output):
+        parser.error("--resume needs --jsonl and --output")
+    if args.start < 0:
+        parser.error("--start can't be negative")
+    if args.iterations is not None and args.iterations < 1:
+        parser.error("--iterations must be at least 1")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+    return args
+
+
+def load_decks(sources: list, cache: DeckCache = None):
+    """
+    Reads the local deck JSON files and fetches the rest of the decks from Moxfield concurrently.
+    :param sources: Moxfield deck URLs or paths of deck JSON files.
+    :param cache: Optional DeckCache for the fetched decks.
+    :return: Generator of (source, deck JSON, exception) tuples, the exception being None on success
+    and the deck JSON being None on failure.
+    """
+    urls = []
+    for source in sources:
+        if os.path.isfile(source):
+            try:
+                with open(source, 'r') as deck_file:
+                    yield source, json.load(deck_file), None
+            except (OSError, ValueError) as e:
+                yield source, None, e
+        else:
+            urls.append(source)
+
+    if urls:
+        yield from fetch_decks(urls, cache=cache)
+
+
+def csv_row(row: dict) -> dict:
+    """
+    Flattens an output row into the CSV columns.
+    :param row: An output row.
+    :return: Dict of CSV_FIELDS.
+    """
+    mana_target = row.get('mana_target')
+    return {'deck': row['deck'], 'names': ' and '.join(row.get('names', [])),
+            'mana_target': json.dumps(list(mana_target)) if mana_target else None,
+            'probability': row.get('probability'), 'turns': row.get('turns'), 'error': row['error']}
+
+
+def main(arguments: list = None) -> int:
+    """
+    Runs the simulation on every deck and writes the results.
+    :param arguments: List of command line arguments. None to read them from sys.argv.
+    :return: Exit status, 1 if any deck failed.
+    """
+    args = parse_arguments(arguments)
+    try:
+        mana_target = mana_target_from_text(args.target)
+    except InvalidInputError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    if args.jsonl:
+        return jsonl_main(args, mana_target)
+
+    cache = None if args.no_cache else DeckCache()
+    output = open(args.output, 'w', newline='') if args.output else sys.stdout
+    rows = []
+    failed = False
+
+    try:
+        if args.format == 'csv':
+            writer = csv.DictWriter(output, fieldnames=CSV_FIELDS)
+            writer.writeheader()
+
+        # One process pool for all decks, only the Monte Carlo simulation needs it
+        workers = args.workers if args.iterations else 1
+        with shared_executor(workers=workers) as executor:
+            for source, deck_json, error in load_decks(args.decks, cache):
+                result = None
+                if deck_json is not None:
+                    try:
+                        result = run_simulation(deck_json, mana_target, MODES[args.mode], args.iterations, args.seed,
+                                                executor)
+                    except DECK_ERRORS as e:
+                        error = e
+                failed = failed or error is not None
+
+                row = result_row(source, result, error)
+                if args.format == 'csv':
+                    writer.writerow(csv_row(row))
+                    output.flush()
+                else:
+                    rows.append(row)
+
+        if args.format == 'json':
+            json.dump(rows, output, indent=2)
+            output.write('\n')
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        if cache:
+            cache.close()
+
+    return 1 if failed else 0
+
+
+def jsonl_main(args: argparse.Namespace, mana_target: list) -> int:
+    """
+    Streams the deck JSON records of a JSON lines file or standard input through the pipeline.
+    :param args: The parsed arguments.
+    :param mana_target: Mana target, all zeros for the commander-based one.
+    :return: Exit status, 1 if any deck failed.
+    """
+    start = max(args.start, resume_offset(args.output)) if args.resume else args.start
+    input_stream = sys.stdin if args.jsonl == '-' else open(args.jsonl, 'r')
+    output_stream = open(args.output, 'a' if args.resume else 'w') if args.output else sys.stdout
+
+    try:
+        failed = run_pipeline(input_stream, output_stream, mana_target, MODES[args.mode], args.iterations,
+                              args.seed, args.workers, start)
+    finally:
+        for stream in (input_stream, output_stream):
+            if stream not in (sys.stdin, sys.stdout):
+                stream.close()
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,282 @@
+"""Vectorised Monte Carlo simulations that play many games at once with NumPy."""
+
+import numpy as np
+
+from func.compiled import CompiledDeck, compile_deck
+from func.mana import hall_subsets, signature_mask
+from func.mulligan import OPENING_HAND_SIZE, MulliganPolicy
+
+# Games are played in chunks so that the libraries of a chunk stay small enough for the CPU cache
+CHUNK_SIZE = 100000
+
+
+def encode_deck(deck: CompiledDeck, balance: list) -> tuple:
+    """
+    Encodes the deck as an array of land group indices. Lands are grouped by the required colours they produce,
+    group 0 is reserved for nonlands.
+    :param deck: A CompiledDeck object describing the deck.
+    :param balance: A list describing the required mana.
+    :return: Tuple where the first value is the encoded deck (array) and the second value is a list of
+    the required colour bitmasks produced by each group (None for nonlands).
+    """
+    required_mask = signature_mask(balance)
+    group_masks = [None]
+    encoded_deck = []
+    for signature_id in deck.library:
+        if signature_id >= 0:
+            mask = signature_mask(deck.signatures[signature_id]) & required_mask
+            if mask not in group_masks:
+                group_masks.append(mask)
+            encoded_deck.append(group_masks.index(mask))
+        else:
+            encoded_deck.append(0)
+    return np.array(encoded_deck, dtype=np.int8), group_masks
+
+
+def hall_matrix(group_masks: list, balance: list) -> tuple:
+    """
+    Builds the matrix that turns land group counts into the number of lands touching each Hall combination.
+    The last column counts all lands for the total mana requirement.
+    :param group_masks: A list of the required colour bitmasks produced by each group (None for nonlands).
+    :param balance: A list describing the required mana.
+    :return: Tuple where the first value is the matrix (groups x combinations) and the second value
+    the array of manas each combination requires.
+    """
+    subsets = hall_subsets(balance)
+    matrix = np.zeros((len(group_masks), len(subsets) + 1), dtype=np.float32)
+    for group, mask in enumerate(group_masks):
+        if mask is None:
+            continue
+        for column, (subset_mask, _) in enumerate(subsets):
+            if mask & subset_mask:
+                matrix[group, column] = 1
+        matrix[group, -1] = 1
+    needs = np.array([need for _, need in subsets] + [sum(balance)], dtype=np.float32)
+    return matrix, needs
+
+
+def draw_card(libraries: np.ndarray, rows: np.ndarray, draw: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Draws the next card from every library with one step of a Fisher-Yates shuffle, so that only the cards
+    that are actually drawn get shuffled.
+    :param libraries: The encoded libraries (games x deck size), shuffled in place.
+    :param rows: Array of row indices of the libraries.
+    :param draw: Number of cards already drawn.
+    :param rng: The NumPy random generator used for shuffling.
+    :return: Array of the drawn cards.
+    """
+    # Swap a random card from the rest of the library into the drawn position
+    swap = rng.integers(draw, libraries.shape[1], size=len(rows))
+    drawn_cards = libraries[rows, swap]
+    libraries[rows, swap] = libraries[:, draw]
+    libraries[:, draw] = drawn_cards
+    return drawn_cards
+
+
+def keep_hands(deck: np.ndarray, group_masks: list, mulligan: MulliganPolicy, games: int,
+               rng: np.random.Generator) -> tuple:
+    """
+    Draws opening hands for many games at once and mulligans them until they are kept.
+    Every attempt reshuffles the first 7 positions of the libraries that are still mulliganing,
+    and the keep and bottom decisions are looked up by land count. A hand's cards are in random order,
+    so keeping its first lands is a random choice of lands.
+    :param deck: The encoded deck.
+    :param group_masks: A list of the required colour bitmasks produced by each group (None for nonlands).
+    :param mulligan: A MulliganPolicy for the opening hand.
+    :param games: Number of games.
+    :param rng: The NumPy random generator used for shuffling.
+    :return: Tuple where the first value is the libraries (games x deck size), with the drawn hands in
+    the first 7 positions and the later draws to be made from position 7, and the second value the land group
+    counts of the kept hands (games x groups).
+    """
+    libraries = np.tile(deck, (games, 1))
+    hand_sizes = np.zeros(games, dtype=np.int16)
+    kept_lands = np.zeros(games, dtype=np.int16)
+    undecided = np.arange(games)
+
+    for attempt in range(0, mulligan.max_mulligans + 1):
+        hands = libraries[undecided]
+        rows = np.arange(len(undecided))
+        for draw in range(0, OPENING_HAND_SIZE):
+            draw_card(hands, rows, draw, rng)
+        libraries[undecided] = hands
+
+        hand_size = mulligan.hand_size(attempt)
+        lands = np.count_nonzero(hands[:, :hand_size], axis=1)
+        keeps = np.array([mulligan.keeps(land_count, attempt)
+                          for land_count in range(0, OPENING_HAND_SIZE + 1)])[lands]
+        kept = np.array([mulligan.kept_lands(land_count, attempt)
+                         for land_count in range(0, OPENING_HAND_SIZE + 1)])[lands]
+        hand_sizes[undecided[keeps]] = hand_size
+        kept_lands[undecided[keeps]] = kept[keeps]
+        undecided = undecided[~keeps]
+        if not len(undecided):
+            break
+
+    # The cards drawn but not kept are out of the later draws, like cards put on the bottom
+    hands = libraries[:, :OPENING_HAND_SIZE]
+    is_land = (hands > 0) & (np.arange(OPENING_HAND_SIZE) < hand_sizes[:, None])
+    kept_land = is_land & (np.cumsum(is_land, axis=1) <= kept_lands[:, None])
+    counts = np.zeros((games, len(group_masks)), dtype=np.float32)
+    for group in range(1, len(group_masks)):
+        counts[:, group] = np.count_nonzero(kept_land & (hands == group), axis=1)
+    return libraries, counts
+
+
+def play_hands(deck: np.ndarray, group_masks: list, balance: list, games: int,
+               rng: np.random.Generator, draws: int, mulligan: MulliganPolicy = None) -> np.ndarray:
+    """
+    Plays many games at once and checks whether the cards drawn can pay the balance.
+    :param deck: The encoded deck.
+    :param group_masks: A list of the required colour bitmasks produced by each group (None for nonlands).
+    :param balance: A list describing the required mana.
+    :param games: Number of games.
+    :param rng: The NumPy random generator used for shuffling.
+    :param draws: Number of cards drawn in a game, the opening hand counting as 7.
+    :param mulligan: A MulliganPolicy for the opening hand. None to keep any 7 cards.
+    :return: Boolean array, True for the games that paid the balance.
+    """
+    matrix, needs = hall_matrix(group_masks, balance)
+    rows = np.arange(games)
+    if mulligan:
+        libraries, counts = keep_hands(deck, group_masks, mulligan, games, rng)
+        start = OPENING_HAND_SIZE
+    else:
+        libraries = np.tile(deck, (games, 1))
+        counts = np.zeros((games, len(group_masks)), dtype=np.float32)
+        start = 0
+
+    for draw in range(start, min(draws, len(deck))):
+        counts[rows, draw_card(libraries, rows, draw, rng)] += 1
+
+    return np.all(counts @ matrix >= needs, axis=1)
+
+
+def play_turns(deck: np.ndarray, group_masks: list, balance: list, games: int,
+               rng: np.random.Generator, mulligan: MulliganPolicy = None) -> np.ndarray:
+    """
+    Plays many games at once, drawing one card at a time from every library until the balance can be paid.
+    :param deck: The encoded deck.
+    :param group_masks: A list of the required colour bitmasks produced by each group (None for nonlands).
+    :param balance: A list describing the required mana.
+    :param games: Number of games.
+    :param rng: The NumPy random generator used for shuffling.
+    :param mulligan: A MulliganPolicy for the opening hand. None to keep any 7 cards.
+    With a policy the kept hand counts as 7 cards drawn and is checked before any card is drawn after it.
+    :return: Array of the number of cards drawn when each game first paid the balance (-1 if it never did).
+    """
+    matrix, needs = hall_matrix(group_masks, balance)
+    first_success = np.full(games, -1, dtype=np.int16)
+    if sum(balance) == 0:
+        first_success[:] = 0
+        return first_success
+
+    # Games that are still drawing, the arrays are compacted to them as games succeed
+    active = np.arange(games)
+    rows = np.arange(games)
+    if mulligan:
+        libraries, counts = keep_hands(deck, group_masks, mulligan, games, rng)
+        start = OPENING_HAND_SIZE
+    else:
+        libraries = np.tile(deck, (games, 1))
+        counts = np.zeros((games, len(group_masks)), dtype=np.float32)
+        start = 0
+
+    # A kept hand is checked before the first card is drawn after it
+    for draw in range(start - 1 if mulligan else start, len(deck)):
+        if draw >= start:
+            counts[rows, draw_card(libraries, rows, draw, rng)] += 1
+
+        hits = np.all(counts @ matrix >= needs, axis=1)
+        first_success[active[hits]] = draw + 1
+        if np.all(hits):
+            break
+        if np.any(hits):
+            remaining = ~hits
+            active = active[remaining]
+            libraries = libraries[remaining]
+            counts = counts[remaining]
+            rows = np.arange(len(active))
+
+    return first_success
+
+
+def batch_probability(deck_json: dict, iterations: int = 1000000, account_generic: bool = True,
+                      override_mt: list = None, seed=None, mulligan: MulliganPolicy = None) -> dict:
+    """
+    Simulates the probability of hitting your mana target on curve, playing all games at once.
+    :param deck_json: The JSON file of the deck, its DeckList or its CompiledDeck.
+    :param iterations: Number of iterations for the simulation. Millions are fine.
+    :param account_generic: True (default) if you're looking to hit your commander's manas. False if colours are enough.
+    :param override_mt: A custom list of manas if you want to override the commander-based mana target.
+    :param seed: Seed for the NumPy random generator. None for a random seed.
+    :param mulligan: A MulliganPolicy for the opening hand. None to keep any 7 cards.
+    :return: Dict of commander_names (list), probability (float), list of manas (list).
+    """
+    if iterations <= 0:
+        raise ValueError("The number of iterations must be positive.")
+    deck = compile_deck(deck_json)
+
+    if override_mt:
+        mana_target = override_mt
+    else:
+        mana_target = deck.get_mana_target()
+
+    commander_names = list(deck.names)
+
+    balance = mana_target[:]
+    if not account_generic:
+        balance[0] = 0
+    draws = sum(mana_target) + 7
+
+    encoded_deck, group_masks = encode_deck(deck, balance)
+    rng = np.random.default_rng(seed)
+    successes = 0
+    for start in range(0, iterations, CHUNK_SIZE):
+        games = min(CHUNK_SIZE, iterations - start)
+        hits = play_hands(encoded_deck, group_masks, balance, games, rng, draws, mulligan)
+        successes += int(np.count_nonzero(hits))
+    probability = successes / iterations
+
+    return {'names': commander_names, 'probability': probability, 'mana_target': mana_target}
+
+
+def batch_turns(deck_json: dict, iterations: int = 1000000, account_generic: bool = True,
+                override_mt: list = None, seed=None, mulligan: MulliganPolicy = None) -> dict:
+    """
+    Simulates the number of turns it takes to hit your mana target, playing all games at once.
+    :param deck_json: The JSON file of the deck, its DeckList or its CompiledDeck.
+    :param iterations: Number of iterations for the simulation. Millions are fine.
+    :param account_generic: True (default) if you're looking to hit your commander's manas. False if colours are enough.
+    :param override_mt: A custom list of manas if you want to override the commander-based mana target.
+    :param seed: Seed for the NumPy random generator. None for a random seed.
+    :param mulligan: A MulliganPolicy for the opening hand. None to keep any 7 cards.
+    :return: A Dict of commander_names (list), turns (float), list of manas (list).
+    """
+    if iterations <= 0:
+        raise ValueError("The number of iterations must be positive.")
+    deck = compile_deck(deck_json)
+
+    if override_mt:
+        mana_target = override_mt
+    else:
+        mana_target = deck.get_mana_target()
+
+    commander_names = list(deck.names)
+
+    balance = mana_target[:]
+    if not account_generic:
+        balance[0] = 0
+
+    encoded_deck, group_masks = encode_deck(deck, balance)
+    rng = np.random.default_rng(seed)
+    chunks = []
+    for start in range(0, iterations, CHUNK_SIZE):
+        games = min(CHUNK_SIZE, iterations - start)
+        chunks.append(play_turns(encoded_deck, group_masks, balance, games, rng, mulligan))
+    first_success = np.concatenate(chunks)
+    if np.any(first_success < 0):
+        raise RuntimeError("Your deck can't hit the mana target even if every card is drawn. "
+                           "Are you sure you have enough lands that can produce appropriate colours?")
+
+    return {'names': commander_names, 'turns': float(np.mean(first_success - 7)), 'mana_target': mana_target}
@@ -0,0 +1,52 @@
+"""Fetches many Moxfield decks concurrently, sharing one connection pool and one rate limit."""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from func.cache import DeckCache
+from func.exceptions import MoxfieldError, UserAgentError
+from func.moxfield import Moxfield, MOXFIELD_API_URL
+from func.ratelimit import TokenBucket
+
+# Default number of concurrent requests and requests per second allowed by the shared rate limiter
+FETCH_WORKERS = 4
+REQUESTS_PER_SECOND = 5
+
+
+def pooled_session(workers: int) -> requests.Session:
+    """
+    Creates a Session that keeps a connection open for each worker.
+    :param workers: Number of threads using the session.
+    :return: The Session object.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def fetch_decks(moxfield_urls: list, workers: int = FETCH_WORKERS, requests_per_second: float = REQUESTS_PER_SECOND,
+                cache: DeckCache = None, api_url: str = MOXFIELD_API_URL):
+    """
+    Fetches decks concurrently and yields them as they arrive, not in the order of the URLs.
+    Every worker shares the connection pool and the rate limiter, so the total request rate stays bounded.
+    :param moxfield_urls: List of Moxfield deck URLs.
+    :param workers: Number of concurrent requests.
+    :param requests_per_second: Maximum number of requests per second, for all workers together.
+    :param cache: Optional DeckCache shared by the workers.
+    :param api_url: Moxfield API endpoint.
+    :return: Generator of (url, deck JSON, exception) tuples, the exception being None on success
+    and the deck JSON being None on failure.
+    """
+    rate_limiter = TokenBucket(requests_per_second)
+    with pooled_session(workers) as session, ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(Moxfield, url, cache=cache, api_url=api_url, session=session,
+                                   rate_limiter=rate_limiter): url for url in moxfield_urls}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result().moxfield_json, None
+            except (MoxfieldError, UserAgentError, ConnectionError, ValueError, requests.RequestException) as e:
+                yield futures[future], None, e
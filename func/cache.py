@@ -0,0 +1,156 @@
+"""On-disk cache of deck JSON files fetched from Moxfield."""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+# Default cache location, lifetime of an entry before it is revalidated (seconds) and size limit (bytes)
+CACHE_DIRECTORY = '.deck_cache'
+CACHE_TTL = 6 * 3600
+CACHE_MAX_BYTES = 50 * 1024 * 1024
+
+# Longest time (seconds) that the use times of cache hits are only kept in memory before the index is saved
+USED_AT_SAVE_INTERVAL = 60
+
+
+class DeckCache:
+    """
+    A content-addressed cache of deck JSON files. Each deck JSON is stored once under the SHA-256 of its content
+    and an index maps deck IDs to the content with the ETag and lastUpdatedAtUtc needed for revalidation.
+    The least recently used decks are evicted when the cache grows past its size limit. The use times of cache hits
+    are saved with the next change of the index, at most USED_AT_SAVE_INTERVAL seconds later or when the cache
+    is closed. The cache can be shared between threads and used as a context manager that closes it.
+    """
+    def __init__(self, directory: str = CACHE_DIRECTORY, ttl: float = CACHE_TTL, max_bytes: int = CACHE_MAX_BYTES):
+        self.__directory = directory
+        self.__ttl = ttl
+        self.__max_bytes = max_bytes
+        self.__index_path = os.path.join(directory, 'index.json')
+        self.__index = {}
+        self.__lock = threading.RLock()
+        self.__unsaved_since = None
+
+        os.makedirs(os.path.join(directory, 'decks'), exist_ok=True)
+        if os.path.exists(self.__index_path):
+            try:
+                with open(self.__index_path, 'r') as index_file:
+                    self.__index = json.load(index_file)
+            except (ValueError, OSError):
+                # A broken index only costs a refetch
+                self.__index = {}
+
+    def __blob_path(self, digest: str) -> str:
+        """
+        Path of the file where a deck JSON is stored.
+        :param digest: SHA-256 of the deck JSON.
+        :return: The path.
+        """
+        return os.path.join(self.__directory, 'decks', f'{digest}.json')
+
+    def __save_index(self):
+        """
+        Writes the index to disk, replacing the old one in one step.
+        """
+        temporary_path = f'{self.__index_path}.tmp'
+        with open(temporary_path, 'w') as index_file:
+            json.dump(self.__index, index_file)
+        os.replace(temporary_path, self.__index_path)
+        self.__unsaved_since = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Saves the use times of the cache hits that are only kept in memory.
+        """
+        with self.__lock:
+            if self.__unsaved_since is not None:
+                self.__save_index()
+
+    def lookup(self, deck_id: str):
+        """
+        Finds a cached deck and marks it as recently used.
+        :param deck_id: The Moxfield deck ID.
+        :return: Dict of deck (dict), etag (str or None), last_updated (str or None) and fresh (bool),
+        fresh being True if the entry is younger than the TTL. None if the deck isn't cached.
+        """
+        with self.__lock:
+            entry = self.__index.get(deck_id)
+            if not entry:
+                return None
+            try:
+                with open(self.__blob_path(entry['digest']), 'r') as deck_file:
+                    deck_json = json.load(deck_file)
+            except (ValueError, OSError):
+                del self.__index[deck_id]
+                self.__save_index()
+                return None
+
+            # Hits only change use times, which are saved in bulk rather than once per hit
+            now = time.time()
+            entry['used_at'] = now
+            if self.__unsaved_since is None:
+                self.__unsaved_since = now
+            elif now - self.__unsaved_since >= USED_AT_SAVE_INTERVAL:
+                self.__save_index()
+            return {'deck': deck_json, 'etag': entry['etag'], 'last_updated': entry['last_updated'],
+                    'fresh': time.time() - entry['fetched_at'] < self.__ttl}
+
+    def refresh(self, deck_id: str):
+        """
+        Marks a cached deck as revalidated, e.g. after a 304 Not Modified response.
+        :param deck_id: The Moxfield deck ID.
+        """
+        with self.__lock:
+            if deck_id in self.__index:
+                self.__index[deck_id]['fetched_at'] = time.time()
+                self.__save_index()
+
+    def store(self, deck_id: str, deck_json: dict, etag: str = None):
+        """
+        Stores a deck and evicts the least recently used decks if the cache is too big.
+        :param deck_id: The Moxfield deck ID.
+        :param deck_json: The deck's JSON file.
+        :param etag: The ETag header of the response, if any.
+        """
+        with self.__lock:
+            content = json.dumps(deck_json, sort_keys=True)
+            digest = hashlib.sha256(content.encode('utf-8')).hexdigest()
+            blob_path = self.__blob_path(digest)
+            if not os.path.exists(blob_path):
+                temporary_path = f'{blob_path}.tmp'
+                with open(temporary_path, 'w') as deck_file:
+                    deck_file.write(content)
+                os.replace(temporary_path, blob_path)
+
+            now = time.time()
+            self.__index[deck_id] = {'digest': digest, 'etag': etag, 'last_updated': deck_json.get('lastUpdatedAtUtc'),
+                                     'fetched_at': now, 'used_at': now, 'size': len(content)}
+            self.__evict()
+            self.__save_index()
+
+    def __evict(self):
+        """
+        Removes the least recently used decks until the cache fits its size limit.
+        Content shared by several deck IDs is counted and deleted once.
+        """
+        sizes = {}
+        for entry in self.__index.values():
+            sizes[entry['digest']] = entry['size']
+
+        for deck_id in sorted(self.__index, key=lambda key: self.__index[key]['used_at']):
+            if sum(sizes.values()) <= self.__max_bytes or len(self.__index) <= 1:
+                break
+            digest = self.__index.pop(deck_id)['digest']
+            if all(entry['digest'] != digest for entry in self.__index.values()):
+                del sizes[digest]
+                try:
+                    os.remove(self.__blob_path(digest))
+                except OSError:
+                    pass
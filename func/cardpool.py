@@ -1,7 +1,16 @@
 """Describes cards, card pools and their associated functions."""
 
+from functools import lru_cache
+
+from func.mana import MANA_FIELD_MASK, pack_mana, packed_hall_subsets, unpack_mana
 from func.moxfield import DeckList, Card
 
+# Maximum number of cached verdicts of assignment_verdict
+VERDICT_CACHE_SIZE = 4096
+
+# Maximum number of hands stored in one VerdictTable
+VERDICT_TABLE_SIZE = 65536
+
 
 def get_card(cards: DeckList, identifier) -> Card:
     """
@@ -13,6 +22,21 @@ def get_card(cards: DeckList, identifier) -> Card:
     return cards.get_card(identifier)
 
 
+def count_signatures(decklist: DeckList, identifiers: list) -> list:
+    """
+    Counts the land signatures of a card pool.
+    :param decklist: A DeckList object where all Card objects can be found.
+    :param identifiers: Identifiers of cards in the card pool.
+    :return: A list of the number of lands with each signature, in the order of decklist.signatures.
+    """
+    signature_counts = [0] * len(decklist.signatures)
+    for identifier in identifiers:
+        signature_id = decklist.card_signature_ids[identifier]
+        if signature_id >= 0:
+            signature_counts[signature_id] += 1
+    return signature_counts
+
+
 def success(decklist: DeckList, mana_balance: list, identifiers: list, generic: bool) -> bool:
     """
     Boolean for whether the CardPool object is in success state.
@@ -22,128 +46,129 @@ def success(decklist: DeckList, mana_balance: list, identifiers: list, generic:
     :param generic: True if generic mana is accounted for, False if not.
     :return: True if success, False if not.
     """
-    # Copy mana target and override generic mana to 0 if generic flag is set to False
-    # balance: list = deepcopy(mana_balance)
-    balance = mana_balance[:]
-    if not generic:
-        balance[0] = 0
-
-    # Copy the list of identifiers from
-    # remaining_ids: list = deepcopy(identifiers)
-    remaining_ids = identifiers[:]
-
-    # Temporary storage for subtracting from generic mana later
-    storage = []
-
-    # For each land card in the remaining pool...
-    for land_card_id in remaining_ids[:]:
-        land_card = get_card(decklist, land_card_id)
-        # Find all cases of lands that have a single colour wubrg+c or a(ny)
-        if land_card.get_total_colours_count() == 1:
-            # Attempt to subtract the identity from ManaTarget and return whether it was a success
-            result = subtract_from_balance(balance, land_card)
-            balance = result[0]
-            if result[1]:
-                remaining_ids.remove(land_card_id)
-            else:
-                storage.append(land_card_id)
-                remaining_ids.remove(land_card_id)
-
-    # For each land card in the remaining pool...
-    for land_card_id in remaining_ids[:]:
-        land_card = get_card(decklist, land_card_id)
-        # Find all cases of lands that have a single colour wubrg+c or a(ny)
-        if land_card.get_total_colours_count() == 2:
-            # Attempt to subtract the identity from ManaTarget and return whether it was a success
-            result = subtract_from_balance(balance, land_card)
-            balance = result[0]
-            if result[1]:
-                remaining_ids.remove(land_card_id)
-            else:
-                storage.append(land_card_id)
-                remaining_ids.remove(land_card_id)
-
-    # For each land card in the remaining pool...
-    for land_card_id in remaining_ids[:]:
-        land_card = get_card(decklist, land_card_id)
-        # Find all cases of lands that have a single colour wubrg+c or a(ny)
-        if land_card.get_total_colours_count() == 3:
-            # Attempt to subtract the identity from ManaTarget and return whether it was a success
-            result = subtract_from_balance(balance, land_card)
-            balance = result[0]
-            if result[1]:
-                remaining_ids.remove(land_card_id)
-            else:
-                storage.append(land_card_id)
-                remaining_ids.remove(land_card_id)
-
-    # For each land card in the remaining pool...
-    for land_card_id in remaining_ids[:]:
-        land_card = get_card(decklist, land_card_id)
-        # Find all cases of lands that have a single colour wubrg+c or a(ny)
-        if land_card.get_total_colours_count() == 4:
-            # Attempt to subtract the identity from ManaTarget and return whether it was a success
-            result = subtract_from_balance(balance, land_card)
-            balance = result[0]
-            if result[1]:
-                remaining_ids.remove(land_card_id)
-            else:
-                storage.append(land_card_id)
-                remaining_ids.remove(land_card_id)
-
-    # For each land card in the remaining pool...
-    for land_card_id in remaining_ids[:]:
-        land_card = get_card(decklist, land_card_id)
-        # Find all cases of lands that have a single colour wubrg+c or a(ny)
-        if land_card.get_total_colours_count() == 5:
-            # Attempt to subtract the identity from ManaTarget and return whether it was a success
-            result = subtract_from_balance(balance, land_card)
-            balance = result[0]
-            if result[1]:
-                remaining_ids.remove(land_card_id)
-            else:
-                storage.append(land_card_id)
-                remaining_ids.remove(land_card_id)
-
-    # Subtract remaining identities from generic mana
-    for land_card_id in storage[:]:
-        if balance[0] > 0:
-            balance[0] -= 1
-            storage.remove(land_card_id)
-
-    # If mana target pool is empty it's a success
-    if sum(balance) <= 0:
-        return True
-    else:
-        return False
+    return success_from_counts(decklist.signature_masks, count_signatures(decklist, identifiers), mana_balance,
+                               generic)
 
 
-def subtract_from_balance(balance_list: list, land_card: Card) -> tuple:
+def success_from_counts(signature_masks: tuple, signature_counts: list, mana_balance: list, generic: bool) -> bool:
     """
-    Subtracts mana produced by a land card from the balance.
-    :param balance_list: A list of previous mana balance.
-    :param land_card: A Card object to subtract from the balance.
-    :return: Tuple where first value is the new balance and the second value is True if subtraction happened.
+    Boolean for whether lands counted by signature can pay the mana balance.
+    Counts above the total mana required can't change the verdict, so they are capped to make hands share verdicts.
+    :param signature_masks: A tuple of land signature colour bitmasks.
+    :param signature_counts: A list of the number of lands with each signature.
+    :param mana_balance: A list describing the available mana.
+    :param generic: True if generic mana is accounted for, False if not.
+    :return: True if success, False if not.
     """
-    new_balance = balance_list
+    packed_balance, total = packed_balance_total(tuple(mana_balance), generic)
+    capped_counts = tuple(count if count < total else total for count in signature_counts)
+    return assignment_verdict(signature_masks, capped_counts, packed_balance)
+
 
-    # No subtraction has happened yet
-    subtraction = False
+@lru_cache(maxsize=256)
+def packed_balance_total(mana_balance: tuple, generic: bool) -> tuple:
+    """
+    Packs the mana balance, without generic mana if it isn't accounted for.
+    :param mana_balance: A tuple describing the required mana.
+    :param generic: True if generic mana is accounted for, False if not.
+    :return: Tuple of the packed balance and its total mana.
+    """
+    packed_balance = pack_mana(mana_balance)
+    if not generic:
+        packed_balance &= ~MANA_FIELD_MASK
+    return packed_balance, sum(unpack_mana(packed_balance))
 
-    # Loop over all indices in balance
-    for i in range(1, len(balance_list)):
 
-        # If balance has mana left and the land produces the corresponding mana subtract 1
-        if (balance_list[i] > 0) and (land_card.mana_produced[i] > 0):
-            new_balance[i] -= 1
+@lru_cache(maxsize=VERDICT_CACHE_SIZE)
+def assignment_verdict(signature_masks: tuple, signature_counts: tuple, packed_balance: int) -> bool:
+    """
+    Boolean for whether lands counted by signature can pay the balance, with the best possible assignment of lands.
+    By Hall's theorem an assignment exists if there are enough lands in total and, for every combination
+    of required colours, enough lands producing at least one of them, which are mask tests.
+    Verdicts are cached per hand signature.
+    :param signature_masks: A tuple of land signature colour bitmasks.
+    :param signature_counts: A tuple of the number of lands with each signature.
+    :param packed_balance: The required mana packed with pack_mana.
+    :return: True if success, False if not.
+    """
+    if sum(signature_counts) < sum(unpack_mana(packed_balance)):
+        return False
 
-            # Subtraction happened, stop iterating
-            subtraction = True
-            break
+    for subset_mask, need in packed_hall_subsets(packed_balance):
+        lands = 0
+        for mask, count in zip(signature_masks, signature_counts):
+            if mask & subset_mask:
+                lands += count
+        if lands < need:
+            return False
+    return True
 
-    # If balance contains generic mana and subtraction hasn't happened yet subtract 1 from generic mana
-    if balance_list[0] > 0 and not subtraction:
-        new_balance[0] -= 1
-        subtraction = True
 
-    return new_balance, subtraction
+class VerdictTable:
+    """
+    A lookup table of the verdicts of one deck's hands for one mana target. A hand is keyed by an int
+    that packs its land count of each signature, so a simulation can update the key one draw at a time
+    by adding the increment of the drawn land's signature. The table is filled lazily as hands are seen
+    and stops storing new hands at max_entries, which bounds its memory.
+    """
+    def __init__(self, signature_masks: tuple, signature_totals: list, mana_balance: list, generic: bool,
+                 max_entries: int = VERDICT_TABLE_SIZE):
+        self.__signature_masks = tuple(signature_masks)
+        self.__mana_balance = list(mana_balance)
+        self.__generic = generic
+        self.__max_entries = max_entries
+        self.__verdicts = {}
+
+        # Each signature gets a bit field wide enough for every land of that signature in the deck
+        self.__widths = tuple(max(1, total.bit_length()) for total in signature_totals)
+        offsets = []
+        offset = 0
+        for width in self.__widths:
+            offsets.append(offset)
+            offset += width
+        self.__offsets = tuple(offsets)
+        self.__increments = tuple(1 << offset for offset in offsets)
+
+    def __len__(self):
+        return len(self.__verdicts)
+
+    @property
+    def increments(self) -> tuple:
+        """
+        Increments property.
+        :return: Tuple of the amount a hand's key grows by when a land of each signature is drawn.
+        """
+        return self.__increments
+
+    def key(self, signature_counts: list) -> int:
+        """
+        Packs a hand's land counts into its key.
+        :param signature_counts: A list of the number of lands with each signature.
+        :return: The key.
+        """
+        key = 0
+        for count, offset in zip(signature_counts, self.__offsets):
+            key |= count << offset
+        return key
+
+    def counts(self, key: int) -> list:
+        """
+        Unpacks a key into the hand's land counts.
+        :param key: The key.
+        :return: A list of the number of lands with each signature.
+        """
+        return [(key >> offset) & ((1 << width) - 1) for offset, width in zip(self.__offsets, self.__widths)]
+
+    def verdict(self, key: int) -> bool:
+        """
+        Boolean for whether the hand can pay the mana balance, looked up or solved and stored.
+        :param key: The hand's key.
+        :return: True if success, False if not.
+        """
+        verdict = self.__verdicts.get(key)
+        if verdict is None:
+            verdict = success_from_counts(self.__signature_masks, self.counts(key), self.__mana_balance,
+                                          self.__generic)
+            if len(self.__verdicts) < self.__max_entries:
+                self.__verdicts[key] = verdict
+        return verdict
@@ -0,0 +1,227 @@
+"""A compact, immutable deck model that the simulations run on, so that a deck is parsed only once."""
+
+import json
+from functools import lru_cache
+
+from func.cardpool import VerdictTable
+from func.mana import signature_mask
+from func.moxfield import DeckList
+
+# Number of verdict tables kept per process, e.g. for a few decks or mana targets at once
+VERDICT_TABLES = 16
+
+
+class CompiledDeck:
+    """
+    The parts of a DeckList that the simulations need: commander names, the commander-based mana target,
+    the distinct land signatures and the signature index of every card in the library (-1 for nonlands).
+    Ramp cards are nonlands in the library, the ramp simulation finds their records (packed cost, mana mask,
+    mana amount, delay) through the producer index of every card in the library (-1 for other cards)
+    and which lands enter tapped through the tapped flag of every card in the library.
+    The object is immutable, picklable and can be saved to and loaded from a JSON file.
+    """
+    def __init__(self, decklist: DeckList = None, names=(), mana_target=(), signatures=(), library=(),
+                 producers=(), producer_library=(), tapped_library=()):
+
+        # Compile the DeckList if one is provided, otherwise use the given parts (e.g. from a saved file)
+        if decklist:
+            names = [commander.name for commander in decklist.commanders]
+            mana_target = decklist.get_mana_target()
+            signatures = decklist.signatures
+            library = [decklist.card_signature_ids[identifier] for identifier in decklist.card_ids]
+            producers = decklist.producers
+            producer_library = [decklist.card_producer_ids[identifier] for identifier in decklist.card_ids]
+            tapped_library = [int(decklist.card_enters_tapped[identifier]) for identifier in decklist.card_ids]
+
+        self.__names = tuple(names)
+        self.__mana_target = tuple(mana_target)
+        self.__signatures = tuple(tuple(signature) for signature in signatures)
+        self.__signature_masks = tuple(signature_mask(signature) for signature in self.__signatures)
+        self.__library = tuple(library)
+        self.__producers = tuple(tuple(producer) for producer in producers)
+        self.__producer_library = tuple(producer_library) or tuple(-1 for _ in self.__library)
+        self.__tapped_library = tuple(tapped_library) or tuple(0 for _ in self.__library)
+
+    def __str__(self):
+        return (f"CompiledDeck: {' and '.join(self.__names)}, {self.deck_size} cards, "
+                f"{self.deck_size - self.nonland_count} lands in {len(self.__signatures)} signatures")
+
+    def __eq__(self, other):
+        return isinstance(other, CompiledDeck) and self.to_dict() == other.to_dict()
+
+    def __hash__(self):
+        return hash((self.__names, self.__mana_target, self.__signatures, self.__library, self.__producers,
+                     self.__producer_library, self.__tapped_library))
+
+    @property
+    def names(self) -> tuple:
+        """
+        Commander names property.
+        :return: Tuple of names.
+        """
+        return self.__names
+
+    @property
+    def signatures(self) -> tuple:
+        """
+        Land signatures property.
+        :return: Tuple of the distinct land signatures (mana_produced tuples) ordered by colour count.
+        """
+        return self.__signatures
+
+    @property
+    def signature_masks(self) -> tuple:
+        """
+        Land signature bitmasks property.
+        :return: Tuple of the colour bitmask of each land signature, bit i set if the signature produces mana i.
+        """
+        return self.__signature_masks
+
+    @property
+    def library(self) -> tuple:
+        """
+        Library property.
+        :return: Tuple of the signature index of every card in the deck, -1 for nonlands.
+        """
+        return self.__library
+
+    @property
+    def producers(self) -> tuple:
+        """
+        Ramp records property.
+        :return: Tuple of the distinct (packed cost, mana mask, mana amount, delay) records of the ramp cards.
+        """
+        return self.__producers
+
+    @property
+    def producer_library(self) -> tuple:
+        """
+        Producer library property.
+        :return: Tuple of the ramp record index of every card in the deck, -1 for cards that aren't ramp.
+        """
+        return self.__producer_library
+
+    @property
+    def tapped_library(self) -> tuple:
+        """
+        Tapped library property.
+        :return: Tuple of 1 for every card in the deck that enters tapped (or fetches a tapped land), 0 otherwise.
+        """
+        return self.__tapped_library
+
+    @property
+    def deck_size(self) -> int:
+        """
+        Deck size property.
+        :return: Number of cards in the deck.
+        """
+        return len(self.__library)
+
+    @property
+    def nonland_count(self) -> int:
+        """
+        Nonland count property.
+        :return: Number of cards in the deck that don't produce mana.
+        """
+        return self.__library.count(-1)
+
+    def get_mana_target(self) -> list:
+        """
+        Gets the list of manas based on the commanders.
+        :return: A list describing the mana required.
+        """
+        return list(self.__mana_target)
+
+    def get_signature_counts(self) -> dict:
+        """
+        Counts the cards in the deck by their mana production signature, like DeckList.get_signature_counts.
+        :return: A dict of signature (tuple) to the number of cards with that signature.
+        """
+        signature_counts = {}
+        for signature_id in self.__library:
+            if signature_id >= 0:
+                signature = self.__signatures[signature_id]
+            else:
+                signature = (0, 0, 0, 0, 0, 0, 0)
+            signature_counts[signature] = signature_counts.get(signature, 0) + 1
+        return signature_counts
+
+    def get_verdict_table(self, mana_target: list, generic: bool = True) -> VerdictTable:
+        """
+        Gets the lazily filled verdict table of this deck for a mana target. The table is shared by every
+        simulation of the deck and mana target in this process, whichever mode it runs.
+        :param mana_target: A list containing the mana target.
+        :param generic: True if generic mana is accounted for, False if not.
+        :return: The VerdictTable object.
+        """
+        return shared_verdict_table(self, tuple(mana_target), generic)
+
+    def to_dict(self) -> dict:
+        """
+        Converts the deck into a JSON serialisable dict.
+        :return: The dict.
+        """
+        return {'names': list(self.__names), 'mana_target': list(self.__mana_target),
+                'signatures': [list(signature) for signature in self.__signatures], 'library': list(self.__library),
+                'producers': [list(producer) for producer in self.__producers],
+                'producer_library': list(self.__producer_library), 'tapped_library': list(self.__tapped_library)}
+
+    def save(self, path: str):
+        """
+        Saves the deck into a JSON file.
+        :param path: Path of the file.
+        """
+        with open(path, 'w') as deck_file:
+            json.dump(self.to_dict(), deck_file)
+
+    @classmethod
+    def from_dict(cls, deck_dict: dict):
+        """
+        Creates the deck from a dict made by to_dict. Dicts saved before ramp and land behaviour were compiled
+        have no ramp cards and no tapped lands.
+        :param deck_dict: The dict.
+        :return: The CompiledDeck object.
+        """
+        return cls(names=deck_dict['names'], mana_target=deck_dict['mana_target'],
+                   signatures=deck_dict['signatures'], library=deck_dict['library'],
+                   producers=deck_dict.get('producers', ()), producer_library=deck_dict.get('producer_library', ()),
+                   tapped_library=deck_dict.get('tapped_library', ()))
+
+    @classmethod
+    def load(cls, path: str):
+        """
+        Loads a deck saved with save.
+        :param path: Path of the file.
+        :return: The CompiledDeck object.
+        """
+        with open(path, 'r') as deck_file:
+            return cls.from_dict(json.load(deck_file))
+
+
+@lru_cache(maxsize=VERDICT_TABLES)
+def shared_verdict_table(deck: CompiledDeck, mana_target: tuple, generic: bool) -> VerdictTable:
+    """
+    Creates the verdict table of a deck for a mana target, cached so that later calls share it.
+    :param deck: The CompiledDeck object.
+    :param mana_target: A tuple containing the mana target.
+    :param generic: True if generic mana is accounted for, False if not.
+    :return: The VerdictTable object.
+    """
+    signature_totals = [0] * len(deck.signatures)
+    for signature_id in deck.library:
+        if signature_id >= 0:
+            signature_totals[signature_id] += 1
+    return VerdictTable(deck.signature_masks, signature_totals, list(mana_target), generic)
+
+
+def compile_deck(deck) -> CompiledDeck:
+    """
+    Compiles a deck for the simulations unless it is compiled already.
+    :param deck: The JSON file of the deck, a DeckList object or a CompiledDeck object.
+    :return: The CompiledDeck object.
+    """
+    if isinstance(deck, CompiledDeck):
+        return deck
+    if isinstance(deck, DeckList):
+        return CompiledDeck(deck)
+    return CompiledDeck(DeckList(deck_json=deck))
@@ -0,0 +1,273 @@
+"""Exact (analytical) probability functions based on land signature counts."""
+
+from math import comb
+
+from func.compiled import CompiledDeck, compile_deck
+from func.mana import hall_subsets, popcount, signature_mask
+from func.mulligan import OPENING_HAND_SIZE, MulliganPolicy
+
+
+def success_weights(signature_counts: dict, balance: list, max_lands: int) -> list:
+    """
+    Counts, for each number of lands drawn, the land combinations of the deck that pay the balance.
+    Lands are grouped by the required colours they produce and the groups are combined one by one,
+    keeping only how far each Hall combination is from being satisfied. This keeps the number of states small
+    regardless of how many different lands the deck has.
+    :param signature_counts: A dict of mana production signature to the number of such cards in the deck.
+    :param balance: A list describing the required mana.
+    :param max_lands: The largest number of lands drawn that is of interest.
+    :return: A list where index d is the number of successful ways of drawing exactly d lands.
+    """
+    subsets = hall_subsets(balance)
+    subset_masks = [subset_mask for subset_mask, _ in subsets]
+    caps = tuple([need for _, need in subsets] + [sum(balance)])
+
+    # Group lands by the required colours they produce, colours that aren't required don't matter
+    required_mask = 0
+    for subset_mask in subset_masks:
+        required_mask |= subset_mask
+    groups = {}
+    for signature, count in signature_counts.items():
+        if sum(signature) > 0:
+            mask = signature_mask(signature) & required_mask
+            groups[mask] = groups.get(mask, 0) + count
+
+    # The ways to reach a state are kept as one packed integer: the ways of drawing d lands sit at bit field d.
+    # A field can never overflow because there are fewer than 2 ** lands ways of drawing d lands.
+    field = sum(groups.values()) + 1
+    truncate = (1 << (field * (max_lands + 1))) - 1
+
+    # States map progress towards each cap to the number of ways to reach it
+    # Lands that produce many colours saturate many combinations at once, so combining them first keeps fewer states
+    states = {tuple(0 for _ in caps): 1}
+    for mask, group_size in sorted(groups.items(), key=lambda group: -popcount(group[0])):
+        touched = [bool(mask & subset_mask) for subset_mask in subset_masks] + [True]
+        group_ways = [comb(group_size, amount) << (field * amount)
+                      for amount in range(0, min(group_size, max_lands) + 1)]
+        new_states = {}
+        for progress, packed_ways in states.items():
+            # Drawing more of this group stops making progress once every combination it touches is satisfied
+            new_progress = progress
+            saturated = False
+            for amount, amount_ways in enumerate(group_ways):
+                if amount > 0 and not saturated:
+                    next_progress = tuple(
+                        value + 1 if touch and value < cap else value
+                        for value, cap, touch in zip(new_progress, caps, touched)
+                    )
+                    saturated = next_progress == new_progress
+                    new_progress = next_progress
+                new_states[new_progress] = new_states.get(new_progress, 0) + packed_ways * amount_ways
+        states = {progress: packed_ways & truncate for progress, packed_ways in new_states.items()}
+
+    packed_weights = states.get(caps, 0)
+    weights = [(packed_weights >> (field * drawn)) & ((1 << field) - 1) for drawn in range(0, max_lands + 1)]
+    return weights
+
+
+def hit_probability(deck: CompiledDeck, balance: list, draws: int, mulligan: MulliganPolicy = None) -> float:
+    """
+    Calculates the exact probability that a number of cards drawn from the deck can pay the balance.
+    :param deck: A CompiledDeck object describing the deck.
+    :param balance: A list describing the required mana.
+    :param draws: Number of cards drawn, the opening hand included.
+    :param mulligan: A MulliganPolicy for the opening hand. None to keep any 7 cards.
+    :return: The probability.
+    """
+    if mulligan:
+        return mulligan_hit_probabilities(deck, balance, mulligan, draws - OPENING_HAND_SIZE)[-1]
+    return hit_probabilities(deck, balance, [draws])[0]
+
+
+def hit_probabilities(deck: CompiledDeck, balance: list, draw_counts: list) -> list:
+    """
+    Calculates the exact probability that the cards drawn from the deck can pay the balance
+    for many numbers of cards drawn, counting the successful land combinations only once.
+    :param deck: A CompiledDeck object describing the deck.
+    :param balance: A list describing the required mana.
+    :param draw_counts: A list of numbers of cards drawn, the opening hand included.
+    Numbers larger than the deck count as drawing the whole deck.
+    :return: A list of the probabilities, one per number of cards drawn.
+    """
+    signature_counts = deck.get_signature_counts()
+    deck_size = deck.deck_size
+    nonland_count = signature_counts.get(tuple(0 for _ in balance), 0)
+    weights = success_weights(signature_counts, balance, min(max(draw_counts), deck_size - nonland_count))
+
+    # Fill the rest of the hand with nonlands (multivariate hypergeometric)
+    probabilities = []
+    for draws in draw_counts:
+        draws = min(draws, deck_size)
+        ways = sum(weight * comb(nonland_count, draws - drawn)
+                   for drawn, weight in enumerate(weights) if drawn <= draws)
+        probabilities.append(ways / comb(deck_size, draws))
+    return probabilities
+
+
+def mulligan_hit_probabilities(deck: CompiledDeck, balance: list, mulligan: MulliganPolicy,
+                               max_later_draws: int) -> list:
+    """
+    Calculates the exact probability that the kept hand and the cards drawn after it can pay the balance,
+    for every number of cards drawn after the hand. Mulligans and bottoms only look at the number of lands,
+    so every set of lands of a size is equally likely to end up in hand and the land count is all that matters.
+    :param deck: A CompiledDeck object describing the deck.
+    :param balance: A list describing the required mana.
+    :param mulligan: A MulliganPolicy for the opening hand.
+    :param max_later_draws: The largest number of cards drawn after the hand that is of interest.
+    :return: A list where index d is the probability of paying the balance after d more cards are drawn.
+    """
+    signature_counts = deck.get_signature_counts()
+    deck_size = deck.deck_size
+    land_count = deck_size - signature_counts.get(tuple(0 for _ in balance), 0)
+    weights = success_weights(signature_counts, balance, land_count)
+    success_rates = [weight / comb(land_count, lands) for lands, weight in enumerate(weights)]
+    outcomes = mulligan.outcomes(land_count, deck_size)
+
+    probabilities = []
+    for later_draws in range(0, max_later_draws + 1):
+        probability = 0.0
+        for outcome_probability, hand_size, drawn_lands, kept_lands in outcomes:
+            # The later cards come from the cards that weren't drawn for the kept hand
+            rest_size = deck_size - hand_size
+            rest_lands = land_count - drawn_lands
+            rest_draws = min(later_draws, rest_size)
+            for lands in range(0, min(rest_draws, rest_lands) + 1):
+                draw_probability = (comb(rest_lands, lands) * comb(rest_size - rest_lands, rest_draws - lands)
+                                    / comb(rest_size, rest_draws))
+                probability += outcome_probability * draw_probability * success_rates[kept_lands + lands]
+        probabilities.append(probability)
+    return probabilities
+
+
+def exact_probability(deck_json: dict, account_generic: bool = True, override_mt: list = None,
+                      mulligan: MulliganPolicy = None) -> dict:
+    """
+    Calculates the exact probability of hitting your mana target on curve without simulating any games.
+    :param deck_json: The JSON file of the deck, its DeckList or its CompiledDeck.
+    :param account_generic: True (default) if you're looking to hit your commander's manas. False if colours are enough.
+    :param override_mt: A custom list of manas if you want to override the commander-based mana target.
+    :param mulligan: A MulliganPolicy for the opening hand. None to keep any 7 cards.
+    :return: Dict of commander_names (list), probability (float), list of manas (list).
+    """
+    deck = compile_deck(deck_json)
+
+    if override_mt:
+        mana_target = override_mt
+    else:
+        mana_target = deck.get_mana_target()
+
+    commander_names = list(deck.names)
+
+    balance = mana_target[:]
+    if not account_generic:
+        balance[0] = 0
+    draws = sum(mana_target) + 7
+
+    probability = hit_probability(deck, balance, draws, mulligan)
+
+    return {'names': commander_names, 'probability': probability, 'mana_target': mana_target}
+
+
+def first_success_distribution(deck: CompiledDeck, balance: list, mulligan: MulliganPolicy = None) -> dict:
+    """
+    Calculates the exact probability that the balance is first paid after exactly n cards are drawn.
+    Drawing more cards never hurts, so the probability of first success at n is the difference between
+    the probabilities of success with n and n - 1 cards.
+    :param deck: A CompiledDeck object describing the deck.
+    :param balance: A list describing the required mana.
+    :param mulligan: A MulliganPolicy for the opening hand. None to keep any 7 cards. With a policy the kept hand
+    counts as 7 cards drawn, however many cards it has, and it is checked before any card is drawn after it.
+    :return: A dict of number of cards drawn (int) to the probability (float).
+    """
+    signature_counts = deck.get_signature_counts()
+    deck_size = deck.deck_size
+    nonland_count = signature_counts.get(tuple(0 for _ in balance), 0)
+    weights = success_weights(signature_counts, balance, deck_size - nonland_count)
+
+    if mulligan:
+        later_probabilities = mulligan_hit_probabilities(deck, balance, mulligan, deck_size - OPENING_HAND_SIZE)
+        cumulatives = [(OPENING_HAND_SIZE + later_draws, probability)
+                       for later_draws, probability in enumerate(later_probabilities)]
+    else:
+        cumulatives = []
+        for draws in range(0, deck_size + 1):
+            ways = sum(weight * comb(nonland_count, draws - drawn)
+                       for drawn, weight in enumerate(weights) if drawn <= draws)
+            cumulatives.append((draws, ways / comb(deck_size, draws)))
+
+    distribution = {}
+    previous = 0.0
+    for draws, cumulative in cumulatives:
+        if cumulative > previous:
+            distribution[draws] = cumulative - previous
+            previous = cumulative
+
+    if not distribution:
+        raise RuntimeError("Your deck can't hit the mana target even if every card is drawn. "
+                           "Are you sure you have enough lands that can produce appropriate colours?")
+    return distribution
+
+
+def exact_turns(deck_json: dict, account_generic: bool = True, override_mt: list = None,
+                percentiles: tuple = (10, 25, 50, 75, 90), mulligan: MulliganPolicy = None) -> dict:
+    """
+    Calculates the exact distribution of the number of turns it takes to hit your mana target.
+    The turn count is the number of cards drawn after the opening hand, the same as in simulate_turns.
+    :param deck_json: The JSON file of the deck, its DeckList or its CompiledDeck.
+    :param account_generic: True (default) if you're looking to hit your commander's manas. False if colours are enough.
+    :param override_mt: A custom list of manas if you want to override the commander-based mana target.
+    :param percentiles: Percentiles (0-100) of the turn count to report.
+    :param mulligan: A MulliganPolicy for the opening hand. None to keep any 7 cards.
+    :return: A Dict of commander_names (list), turns (float), list of manas (list), median (int),
+    percentiles (dict), distribution (dict of turn to probability), cdf (dict of turn to cumulative probability)
+    and probability (float) of hitting the mana target on curve.
+    """
+    deck = compile_deck(deck_json)
+
+    if override_mt:
+        mana_target = override_mt
+    else:
+        mana_target = deck.get_mana_target()
+
+    commander_names = list(deck.names)
+
+    balance = mana_target[:]
+    if not account_generic:
+        balance[0] = 0
+
+    distribution = {}
+    for draws, probability in first_success_distribution(deck, balance, mulligan).items():
+        distribution[draws - 7] = probability
+
+    cdf = {}
+    cumulative = 0.0
+    for turn, probability in distribution.items():
+        cumulative += probability
+        cdf[turn] = cumulative
+
+    turn_percentiles = {}
+    for percentile in percentiles:
+        turn_percentiles[percentile] = turn_percentile(cdf, percentile)
+
+    mean = sum(turn * probability for turn, probability in distribution.items())
+
+    # Hitting the target on curve is the same as first hitting it by the turn equal to its mana value
+    on_curve = sum(probability for turn, probability in distribution.items() if turn <= sum(mana_target))
+
+    return {'names': commander_names, 'turns': mean, 'mana_target': mana_target,
+            'median': turn_percentile(cdf, 50), 'percentiles': turn_percentiles,
+            'distribution': distribution, 'cdf': cdf, 'probability': on_curve}
+
+
+def turn_percentile(cdf: dict, percentile: float) -> int:
+    """
+    Finds the first turn where the cumulative probability reaches the percentile.
+    :param cdf: A dict of turn to cumulative probability, in turn order.
+    :param percentile: The percentile (0-100).
+    :return: The turn.
+    """
+    for turn, cumulative in cdf.items():
+        # Allow for float rounding in the cumulative sum
+        if cumulative >= percentile / 100 - 1e-12:
+            return turn
+    return max(cdf)
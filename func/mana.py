@@ -0,0 +1,85 @@
+"""Bitmask and packed integer representations of mana."""
+
+from functools import lru_cache
+
+# Order of the manas in mana lists, masks and packed ints, 'a' being generic mana
+MANA_ORDER = 'awubrgc'
+
+# Width in bits of each mana count in a packed int, generic mana in the lowest bits
+MANA_FIELD_BITS = 8
+MANA_FIELD_MASK = (1 << MANA_FIELD_BITS) - 1
+
+
+def popcount(mask: int) -> int:
+    """
+    Counts the set bits of a mask, e.g. the number of colours a land produces.
+    :param mask: The bitmask.
+    :return: Number of set bits.
+    """
+    return bin(mask).count('1')
+
+
+def signature_mask(signature) -> int:
+    """
+    Converts a mana production signature into a bitmask where bit i is set if the signature produces mana i.
+    :param signature: A list or tuple describing the mana produced in 'awubrgc' order.
+    :return: The bitmask.
+    """
+    mask = 0
+    for index in range(1, len(signature)):
+        if signature[index] > 0:
+            mask |= 1 << index
+    return mask
+
+
+def pack_mana(manas) -> int:
+    """
+    Packs a list of mana counts into one int with a MANA_FIELD_BITS wide field per mana.
+    :param manas: A list or tuple describing mana counts in 'awubrgc' order.
+    :return: The packed int.
+    """
+    packed = 0
+    for index, count in enumerate(manas):
+        if count < 0 or count >> MANA_FIELD_BITS:
+            raise ValueError(f"A mana count of {count} doesn't fit in {MANA_FIELD_BITS} bits.")
+        packed |= count << (index * MANA_FIELD_BITS)
+    return packed
+
+
+def unpack_mana(packed: int) -> list:
+    """
+    Unpacks an int made by pack_mana.
+    :param packed: The packed int.
+    :return: A list of the 7 mana counts in 'awubrgc' order.
+    """
+    return [(packed >> (index * MANA_FIELD_BITS)) & MANA_FIELD_MASK for index in range(0, len(MANA_ORDER))]
+
+
+def hall_subsets(balance: list) -> list:
+    """
+    Lists every nonempty combination of the coloured manas required by the balance.
+    A hand can pay the balance only if every combination has at least as many lands as it requires manas (Hall).
+    :param balance: A list describing the required mana.
+    :return: A list of tuples where the first value is the combination's bitmask and the second its mana count.
+    """
+    required = [index for index in range(1, len(balance)) if balance[index] > 0]
+    subsets = []
+    for combination in range(1, 2 ** len(required)):
+        mask = 0
+        need = 0
+        for position, index in enumerate(required):
+            if combination & (1 << position):
+                mask |= 1 << index
+                need += balance[index]
+        subsets.append((mask, need))
+    return subsets
+
+
+@lru_cache(maxsize=256)
+def packed_hall_subsets(packed_balance: int) -> tuple:
+    """
+    Cached hall_subsets of a packed balance.
+    :param packed_balance: The balance packed with pack_mana.
+    :return: A tuple of (combination bitmask, mana count) tuples.
+    """
+    return tuple(hall_subsets(unpack_mana(packed_balance)))
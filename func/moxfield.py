@@ -1,134 +1,338 @@
 """Parse decklist into Card objects and other information starting from url."""
 
+import re
 import time
 import requests
 import json
+from functools import lru_cache
 
+from func.cache import DeckCache
 from func.exceptions import MoxfieldError, UserAgentError
+from func.mana import MANA_FIELD_BITS, MANA_ORDER, popcount, signature_mask, unpack_mana
+from func.ratelimit import TokenBucket
 from user_agent import read_ua
 
+# Moxfield API endpoint for decks, the deck ID is appended to it
+MOXFIELD_API_URL = 'https://api.moxfield.com/v2/decks/all/'
+
+# Parsed characteristics of cards by name and the number of cards kept before the table is cleared
+PARSED_CARDS = {}
+PARSED_CARDS_SIZE = 16384
+
+# Mana abilities of mana rocks and dorks, a line that starts with tapping for mana
+MANA_ABILITY = re.compile(r'(?:^|\n)\{T\}: Add ([^.\n]*)')
+
+# Mana symbols and the basic land types that land search spells look for, in 'awubrgc' order
+MANA_SYMBOL = re.compile(r'\{([WUBRGC])\}')
+BASIC_LAND_TYPES = ('', 'Plains', 'Island', 'Swamp', 'Mountain', 'Forest', 'Wastes')
+
+# Number words of mana abilities and land searches
+NUMBER_WORDS = {'one': 1, 'two': 2, 'three': 3}
+
+# Retries of rate limited (429) or failed (5xx) requests and the first backoff in seconds, doubled on every retry
+MAX_RETRIES = 4
+RETRY_BACKOFF = 0.5
+
 
 class Card:
     """
     A parsed card item with characteristics. Note that card_json != deck_json (entire JSON from Moxfield).
+    Cards are slotted and store their mana as packed ints, the characteristics of a card JSON are parsed once
+    and shared by every Card made from a card with the same name.
+    Nonlands that add mana are tagged with their ramp kind ('rock', 'dork' or 'land search'), the mana they add
+    every turn and the number of turns before it can be used.
+    Lands (and MDFCs, by their land face) get a behaviour record: whether they enter tapped, their basic land types
+    and, for fetches and land search, the basic land types they search for. Both type masks use the mana bits
+    of the types ('c' for Wastes) with bit 0 marking basics. A DeckList restricts fetches to its own lands.
     """
+    __slots__ = ('identifier', 'name', 'card_category', 'colour_identity', 'mana_value', 'mana_cost_packed',
+                 'mana_produced_mask', 'ramp_kind', 'ramp_mask', 'ramp_amount', 'ramp_delay', 'enters_tapped',
+                 'land_types', 'fetch_mask')
+
     def __init__(self, identifier: int, card_json=None):
 
-        # Provide a dict containing the card's JSON
-        self.__card_json = card_json
+        # If no JSON is provided, but you still try to parse the card, throw an error
+        if not card_json:
+            raise AttributeError(' > No card JSON file was found. Card object characteristics cannot be parsed.')
 
         # Properties that are accessible
         self.identifier = identifier
-        self.name = ''
-        self.card_category = ''
-        self.colour_identity = ''
-        self.mana_value = 0
-        self.mana_cost = {'a': 0, 'w': 0, 'u': 0, 'b': 0, 'r': 0, 'g': 0, 'c': 0}
-        self.mana_produced = [0, 0, 0, 0, 0, 0, 0]
-
-        # If JSON is present parse the card
-        if self.__card_json:
-            # Parse card properties
-            self.__parse_card(identifier)
-            # Clear JSON because it's rather heavy and there's no reason to keep it around anymore
-            self.__card_json = None
-        # If no JSON is provided, but you still try to parse the card, throw an error
-        else:
-            raise AttributeError(' > No card JSON file was found. Card object characteristics cannot be parsed.')
+        (self.name, self.card_category, self.colour_identity, self.mana_value, self.mana_cost_packed,
+         self.mana_produced_mask, self.ramp_kind, self.ramp_mask, self.ramp_amount, self.ramp_delay,
+         self.enters_tapped, self.land_types, self.fetch_mask) = parse_card_json(card_json)
 
     def __str__(self):
-        properties = "Properties:\n"
-        properties.join(f"'__card_json': dict, is present: {bool(self.__card_json)}\n")
-        properties.join(f"'identifier': int, the Card identifier is {self.identifier}\n")
-        properties.join(f"'name': str, the Card name is {self.name}\n")
-        properties.join(f"'card_category': str, the Card category is {self.card_category}\n")
-        properties.join(f"")
-        return f"Attributes: {self.__dict__}"
-
-    def __set_mana_to_one(self, colour_key: str):
+        return f"Attributes: { {slot: getattr(self, slot) for slot in self.__slots__} }"
+
+    @property
+    def mana_cost(self) -> dict:
         """
-        Sets the correct mana production for the card.
-        :param colour_key: A single character string from wubgrca.
+        Mana cost property, unpacked from mana_cost_packed.
+        :return: A dict of the number of each mana in the cost, 'a' being generic mana.
         """
-        for index, colour in enumerate('awubrgc'):
-            if colour_key == colour:
-                self.mana_produced[index] = 1
+        return dict(zip(MANA_ORDER, unpack_mana(self.mana_cost_packed)))
 
-    def __parse_card(self, identifier: int):
+    @property
+    def mana_produced(self) -> list:
         """
-        Parses the card's JSON into characteristics and empties JSON.
-        :param identifier: The identifier of the Card object or raises ValueError if no json was present.
+        Mana production property, unpacked from mana_produced_mask.
+        :return: A list of 0 or 1 for each mana in the 'awubrgc' order.
         """
+        return [(self.mana_produced_mask >> index) & 1 for index in range(0, 7)]
 
-        self.name = self.__card_json['name']
-        self.identifier = identifier
-
-        # If the card is an MDFC just... ignore it, kinda - it's a nonland
-        if '//' in self.__card_json['type_line']:
-            self.colour_identity = ''.join(self.__card_json['color_identity']).lower()
-            self.card_category = 'nonland'
+    def get_total_colours_count(self) -> int:
+        """
+        Determine total number of different kinds of mana this object can produce.
+        For example: wu land has a value of 2, a basic has a value of 1, rainbows have a value of 5 etc.
+        :return: Number of a land's colour identities.
+        """
+        return popcount(self.mana_produced_mask)
 
-        # Other lands get categorised as lands
-        elif 'Land' in self.__card_json['type_line']:
-            self.card_category = 'land'
+    def is_ramp(self) -> bool:
+        """
+        Boolean for whether the card is a mana rock, a mana dork or a land search spell.
+        :return: True if ramp, False if not.
+        """
+        return bool(self.ramp_kind)
 
-            # If the oracle text contains keywords for any colour or a fetch set identity to wubrg
-            if 'any color' in self.__card_json['oracle_text'] or 'acrifice' in self.__card_json['oracle_text']:
-                self.colour_identity = 'wubrg'
-                for colour_key in self.colour_identity:
-                    self.__set_mana_to_one(colour_key)
+    def is_fetch(self) -> bool:
+        """
+        Boolean for whether the card is a land that searches for another land, like fetch lands and Evolving Wilds.
+        :return: True if fetch, False if not.
+        """
+        return self.card_category == 'land' and bool(self.fetch_mask)
 
-            # If the JSON identity is empty we assume the land can produce colourless mana (cue Maze of Ith...)
-            elif ''.join(self.__card_json['color_identity']) == '':
-                self.colour_identity = 'c'
-                self.__set_mana_to_one('c')
 
-            elif 'Basic' in self.__card_json['type_line']:
-                self.colour_identity = ''.join(self.__card_json['color_identity']).lower()
-                for colour_key in self.colour_identity:
-                    self.__set_mana_to_one(colour_key)
+def parse_card_json(card_json: dict) -> tuple:
+    """
+    Parses a card's JSON into characteristics. The result is cached by card name so that copies of a card
+    and the same card in other decks are parsed only once.
+    :param card_json: The card's JSON.
+    :return: Tuple of name, card category, colour identity, mana value, packed mana cost, mana production mask,
+    ramp kind, ramp mana mask, ramp mana amount, ramp delay, enters tapped, land types and fetch mask.
+    """
+    characteristics = PARSED_CARDS.get(card_json['name'])
+    if characteristics is None:
+        characteristics = parse_card_characteristics(card_json)
+        if len(PARSED_CARDS) >= PARSED_CARDS_SIZE:
+            PARSED_CARDS.clear()
+        PARSED_CARDS[card_json['name']] = characteristics
+    return characteristics
 
-            # Catch all other identities such as duals
-            else:
-                self.colour_identity = ''.join(self.__card_json['color_identity']).lower()
-                for colour_key in self.colour_identity:
-                    self.__set_mana_to_one(colour_key)
 
-        # Catch nonlands
+def parse_card_characteristics(card_json: dict) -> tuple:
+    """
+    Parses a card's JSON into characteristics.
+    :param card_json: The card's JSON.
+    :return: Tuple of name, card category, colour identity, mana value, packed mana cost, mana production mask,
+    ramp kind, ramp mana mask, ramp mana amount, ramp delay, enters tapped, land types and fetch mask.
+    """
+    name = card_json['name']
+    colour_identity = ''
+    mana_cost_packed = 0
+    mana_produced_mask = 0
+    land_face = mdfc_land_face(card_json) if '//' in card_json['type_line'] else None
+
+    # Double faced cards without a land face are nonlands without a cost
+    if '//' in card_json['type_line'] and not land_face:
+        colour_identity = ''.join(card_json['color_identity']).lower()
+        card_category = 'nonland'
+
+    # Other lands get categorised as lands, MDFCs by their land face
+    elif land_face or 'Land' in card_json['type_line']:
+        card_category = 'land'
+        land_face = land_face or card_json
+        face_colours = ''.join(MANA_SYMBOL.findall(' '.join(MANA_ABILITY.findall(land_face.get('oracle_text', '')))))
+
+        # Lands that produce any colour and fetches get wubrg, a DeckList restricts fetches to the lands it has
+        if 'any color' in land_face.get('oracle_text', '') or parse_fetch(land_face.get('oracle_text', '')):
+            colour_identity = 'wubrg'
+
+        # MDFC land faces add the mana of their mana abilities
+        elif land_face is not card_json and face_colours:
+            colour_identity = ''.join(sorted(set(face_colours.lower()), key=MANA_ORDER.index))
+
+        # If the JSON identity is empty we assume the land can produce colourless mana (cue Maze of Ith...)
+        elif ''.join(card_json['color_identity']) == '':
+            colour_identity = 'c'
+
+        # Basics and all other identities such as duals
         else:
-            self.colour_identity = ''.join(self.__card_json['color_identity']).lower()
+            colour_identity = ''.join(card_json['color_identity']).lower()
 
-            # If colour identity is empty (such as colourless Artifacts) give it the 'c' identity
-            if not self.colour_identity:
-                self.colour_identity = 'c'
+        for colour_key in colour_identity:
+            mana_produced_mask |= 1 << MANA_ORDER.index(colour_key)
 
-            self.card_category = 'nonland'
+    # Catch nonlands
+    else:
+        colour_identity = ''.join(card_json['color_identity']).lower()
 
-        # Further sort nonlands' costs but exclude MDFCs again - they're now nonlands with no cost
-        if (self.card_category == 'nonland') and ('//' not in self.__card_json['type_line']):
+        # If colour identity is empty (such as colourless Artifacts) give it the 'c' identity
+        if not colour_identity:
+            colour_identity = 'c'
 
-            # Loop through all colour identity characters in the mana cost
-            for character in self.__card_json['mana_cost']:
+        card_category = 'nonland'
 
-                # Increment mana_cost for each coloured mana
-                if character.lower() in 'wubrgc':
-                    self.mana_cost[character.lower()] += 1
+    # Further sort nonlands' costs but exclude double faced cards again - they're nonlands with no cost
+    if (card_category == 'nonland') and ('//' not in card_json['type_line']):
 
-                # Increment generic mana equal to generic mana in mana cost
-                # This breaks at mana costs above 9
-                elif character.isnumeric():
-                    self.mana_cost['a'] += int(character)
+        # Loop through all colour identity characters in the mana cost
+        for character in card_json['mana_cost']:
 
-        # Set the total mana value of the card
-        self.mana_value = self.__card_json['cmc']
+            # Increment mana_cost for each coloured mana
+            if character.lower() in 'wubrgc':
+                mana_cost_packed += 1 << (MANA_ORDER.index(character.lower()) * MANA_FIELD_BITS)
 
-    def get_total_colours_count(self) -> int:
-        """
-        Determine total number of different kinds of mana this object can produce.
-        For example: wu land has a value of 2, a basic has a value of 1, rainbows have a value of 5 etc.
-        :return: Number of a land's colour identities.
-        """
-        return sum(self.mana_produced)
+            # Increment generic mana equal to generic mana in mana cost
+            # This breaks at mana costs above 9
+            elif character.isnumeric():
+                mana_cost_packed += int(character)
+
+    if card_category == 'nonland' and '//' not in card_json['type_line']:
+        ramp = parse_ramp(card_json)
+        behaviour = (False, 0, parse_fetch(card_json.get('oracle_text', '')) if ramp[0] == 'land search' else 0)
+    elif card_category == 'land':
+        ramp = ('', 0, 0, 0)
+        behaviour = parse_land_behaviour(land_face)
+    else:
+        ramp = ('', 0, 0, 0)
+        behaviour = (False, 0, 0)
+
+    # Set the total mana value of the card
+    return (name, card_category, colour_identity, card_json['cmc'], mana_cost_packed, mana_produced_mask) + ramp + \
+        behaviour
+
+
+def mdfc_land_face(card_json: dict):
+    """
+    Finds the land face of a modal double faced card, which can be played as a land.
+    Transforming cards can't be played by their back face and have no land face.
+    :param card_json: The card's JSON.
+    :return: The JSON of the land face, or None if the card has none.
+    """
+    if card_json.get('layout', 'modal_dfc') != 'modal_dfc':
+        return None
+    for face in card_json.get('card_faces', []):
+        if 'Land' in face.get('type_line', ''):
+            return face
+
+    # Without the faces the land face only has its type line
+    for type_line in card_json['type_line'].split('//'):
+        if 'Land' in type_line:
+            return {'type_line': type_line.strip(), 'oracle_text': ''}
+    return None
+
+
+def parse_land_behaviour(land_json: dict) -> tuple:
+    """
+    Parses the behaviour record of a land (or the land face of an MDFC).
+    :param land_json: The JSON of the land or of the land face.
+    :return: Tuple of enters tapped (bool), land types mask and fetch mask.
+    """
+    type_line = land_json.get('type_line', '')
+    land_types = 0
+    for index, land_type in enumerate(BASIC_LAND_TYPES):
+        if land_type and land_type in type_line.split('—')[-1]:
+            land_types |= 1 << index
+    if 'Basic' in type_line:
+        # Wastes is the basic without a land type
+        land_types |= 1 if land_types else 1 | 1 << MANA_ORDER.index('c')
+    oracle_text = land_json.get('oracle_text', '')
+    return enters_tapped(oracle_text), land_types, parse_fetch(oracle_text)
+
+
+def enters_tapped(oracle_text: str) -> bool:
+    """
+    Boolean for whether a permanent, or the land it puts onto the battlefield, always enters tapped.
+    Shocks (pay life or it enters tapped) and check lands (tapped unless...) are assumed to enter untapped.
+    :param oracle_text: The card's oracle text.
+    :return: True if tapped, False if not.
+    """
+    for sentence in oracle_text.replace('\n', '. ').split('. '):
+        if 'enters the battlefield tapped' in sentence or 'enters tapped' in sentence or \
+                'onto the battlefield tapped' in sentence:
+            if 'unless' not in sentence and "if you don't" not in sentence.lower():
+                return True
+    return False
+
+
+def parse_fetch(oracle_text: str) -> int:
+    """
+    Finds the basic land types a card searches for to put a land onto the battlefield.
+    :param oracle_text: The card's oracle text.
+    :return: The fetch mask, the mana bits of the land types ('c' for Wastes) with bit 0 set if only basics
+    can be found, 0 if the card doesn't search for lands.
+    """
+    search_text = oracle_text.lower()
+    start = search_text.find('search your library for')
+    if start < 0 or 'onto the battlefield' not in search_text:
+        return 0
+    end = search_text.find('.', start)
+    clause = search_text[start:end if end >= 0 else len(search_text)]
+
+    fetch_mask = 0
+    for index, land_type in enumerate(BASIC_LAND_TYPES):
+        if land_type and land_type.lower() in clause:
+            fetch_mask |= 1 << index
+
+    # Any basic land, like Evolving Wilds
+    if not fetch_mask and 'land card' in clause:
+        fetch_mask = signature_mask([0, 1, 1, 1, 1, 1, 1])
+    if fetch_mask and 'basic' in clause:
+        fetch_mask |= 1
+    return fetch_mask
+
+
+def fetchable_mask(fetch_mask: int, lands: list) -> int:
+    """
+    Finds the mana a fetch can get from the lands of a deck.
+    :param fetch_mask: The land types searched for, as made by parse_fetch.
+    :param lands: The land Card objects of the deck that can be found.
+    :return: The mask of the mana produced by the lands that can be found.
+    """
+    mask = 0
+    for land in lands:
+        if land.land_types & fetch_mask & ~1 and (land.land_types & 1 or not fetch_mask & 1):
+            mask |= land.mana_produced_mask
+    return mask
+
+
+def parse_ramp(card_json: dict) -> tuple:
+    """
+    Recognises mana rocks, mana dorks and land search spells from a nonland's oracle text.
+    Rocks can tap for mana the turn they are cast, dorks are summoning sick for a turn
+    and searched lands that enter tapped are usable the next turn.
+    :param card_json: The card's JSON.
+    :return: Tuple of ramp kind ('' if the card isn't ramp), mask of the mana added, amount of mana added per turn
+    and the number of turns before the mana can be used.
+    """
+    oracle_text = card_json.get('oracle_text', '')
+
+    # Cards with many mana abilities (e.g. talismans) tap for one of them, so the largest amount counts
+    mask = 0
+    amount = 0
+    for clause in MANA_ABILITY.findall(oracle_text):
+        if 'any color' in clause or 'any combination of colors' in clause or 'chosen color' in clause:
+            mask |= signature_mask([0, 1, 1, 1, 1, 1, 0])
+            amount = max(amount, NUMBER_WORDS.get(clause.split(' ')[0], 1))
+        else:
+            symbols = MANA_SYMBOL.findall(clause)
+            for symbol in symbols:
+                mask |= 1 << MANA_ORDER.index(symbol.lower())
+
+            # '{R} or {G}' adds one of them, '{C}{C}' adds both
+            amount = max(amount, 1 if ' or ' in clause else len(symbols))
+    if mask:
+        kind = 'dork' if 'Creature' in card_json['type_line'] else 'rock'
+        return kind, mask, amount, 1 if kind == 'dork' or enters_tapped(oracle_text) else 0
+
+    # Searched basics only count for the colours of the deck's own lands, which a DeckList resolves
+    fetch_mask = parse_fetch(oracle_text)
+    if fetch_mask:
+        amount = 2 if 'put them onto the battlefield' in oracle_text.lower() else 1
+        return 'land search', fetch_mask & ~1, amount, 1 if enters_tapped(oracle_text) else 0
+
+    return '', 0, 0, 0
 
 
 class DeckList:
@@ -143,11 +347,26 @@ class DeckList:
         self.card_ids = []
         self.land_ids = []
 
+        # Lookup structures indexed by identifier so that simulations never search through the cards
+        self.card_lookup = {}
+        self.card_enters_tapped = []
+
+        # Distinct land signatures (mana_produced tuples) ordered by colour count, their colour bitmasks
+        # and each identifier's index in them
+        self.signatures = ()
+        self.signature_masks = ()
+        self.card_signature_ids = []
+
+        # Distinct ramp records (packed cost, mana mask, mana amount, delay) and each identifier's index in them
+        self.producers = ()
+        self.card_producer_ids = []
+
         # If JSON is present parse it straight away
         if deck_json:
             self.__deck_json = deck_json
             self.__parse_commander_json()
             self.__parse_deck_json()
+            self.__build_lookup()
             self.__deck_json = None
 
     def __str__(self):
@@ -172,51 +391,76 @@ class DeckList:
         Parses the JSON file into individual Card objects and appends them to the DeckList object.
         """
         for card_index, cardname in enumerate(list(self.__deck_json['mainboard'].keys())):
+            # Every copy of a card shares one Card object
+            card = Card(card_index, self.__deck_json['mainboard'][f'{cardname}']['card'])
             for count in range(0, self.__deck_json['mainboard'][f'{cardname}']['quantity']):
-                card = Card(card_index, self.__deck_json['mainboard'][f'{cardname}']['card'])
                 self.cards.append(card)
                 self.card_ids.append(card_index)
                 if card.card_category == 'land':
                     self.land_ids.append(card_index)
 
+    def __build_lookup(self):
+        """
+        Builds the identifier to Card mapping, the per-identifier enters tapped list, the land signature table
+        and the ramp table.
+        """
+        for card in self.cards:
+            if card.identifier not in self.card_lookup:
+                self.card_lookup[card.identifier] = card
+
+        # Fetches and land search only find the deck's own lands of the types they search for
+        fetchable_lands = [card for card in self.card_lookup.values()
+                           if card.card_category == 'land' and not card.is_fetch()]
+        for card in self.card_lookup.values():
+            if card.is_fetch():
+                card.mana_produced_mask = fetchable_mask(card.fetch_mask, fetchable_lands)
+            elif card.ramp_kind == 'land search':
+                card.ramp_mask = fetchable_mask(card.fetch_mask, fetchable_lands)
+                if not card.ramp_mask:
+                    card.ramp_kind = ''
+
+        size = max(self.card_lookup.keys(), default=-1) + 1
+        self.card_enters_tapped = [False] * size
+        for identifier, card in self.card_lookup.items():
+            self.card_enters_tapped[identifier] = card.enters_tapped
+
+        # Nonlands don't produce mana and get no signature
+        land_signatures = []
+        for card in self.card_lookup.values():
+            signature = tuple(card.mana_produced)
+            if card.mana_produced_mask and signature not in land_signatures:
+                land_signatures.append(signature)
+        self.signatures = tuple(sorted(land_signatures, key=sum))
+        self.signature_masks = tuple(signature_mask(signature) for signature in self.signatures)
+        self.card_signature_ids = [-1] * size
+        for identifier, card in self.card_lookup.items():
+            if card.mana_produced_mask:
+                self.card_signature_ids[identifier] = self.signatures.index(tuple(card.mana_produced))
+
+        # Ramp cards with the same cost and mana share a record
+        producers = []
+        self.card_producer_ids = [-1] * size
+        for identifier, card in self.card_lookup.items():
+            if card.is_ramp():
+                producer = (card.mana_cost_packed, card.ramp_mask, card.ramp_amount, card.ramp_delay)
+                if producer not in producers:
+                    producers.append(producer)
+                self.card_producer_ids[identifier] = producers.index(producer)
+        self.producers = tuple(producers)
+
     def get_mana_target(self) -> list:
         """
         Gets a list of manas based on commander Card objects in the DeckList.
         :return: A list describing the mana required.
         """
-        manas = [0, 0, 0, 0, 0, 0, 0]
-
-        # This dict is for partners and backgrounds etc
-        mana_values = {0: 0, 1: 0}
-
-        # Loop through each commander Card object
-        for index, commander in enumerate(self.commanders):
-
-            # Save the mana value of the commander
-            mana_values[index] = commander.mana_value
+        # The packed costs of all commanders (partners, backgrounds etc.) add up field by field
+        packed_cost = 0
+        for commander in self.commanders:
+            packed_cost += commander.mana_cost_packed
+        manas = [0] + unpack_mana(packed_cost)[1:]
 
-            # Loop through each colour character in the mana cost
-            for colour_key in commander.mana_cost.keys():
-
-                # Exclude generic mana
-                if colour_key != 'a':
-
-                    # Actually change the mana target list's values
-                    if colour_key == 'w':
-                        manas[1] += commander.mana_cost[colour_key]
-                    elif colour_key == 'u':
-                        manas[2] += commander.mana_cost[colour_key]
-                    elif colour_key == 'b':
-                        manas[3] += commander.mana_cost[colour_key]
-                    elif colour_key == 'r':
-                        manas[4] += commander.mana_cost[colour_key]
-                    elif colour_key == 'g':
-                        manas[5] += commander.mana_cost[colour_key]
-                    elif colour_key == 'c':
-                        manas[6] += commander.mana_cost[colour_key]
-
-        # Compare all stored generic costs and pick the bigger one, then subtract all coloured costs
-        manas[0] = int(max(mana_values.values()) - sum(manas))
+        # Pick the biggest mana value of the commanders, then subtract all coloured costs
+        manas[0] = int(max([commander.mana_value for commander in self.commanders], default=0) - sum(manas))
 
         # In some hybrid mana cases it's possible that generic mana is set to negative so just fix that
         if manas[0] < 0:
@@ -224,24 +468,45 @@ class DeckList:
 
         return manas
 
+    def get_signature_counts(self) -> dict:
+        """
+        Counts the cards in the DeckList by their mana production signature, i.e. the mana_produced list.
+        Nonlands (and fetches that find none of the deck's lands) all share the signature where nothing is produced.
+        :return: A dict of signature (tuple) to the number of cards with that signature.
+        """
+        card_counts = {}
+        for card in self.cards:
+            card_counts[card] = card_counts.get(card, 0) + 1
+
+        signature_counts = {}
+        for card, count in card_counts.items():
+            signature = tuple(card.mana_produced)
+            signature_counts[signature] = signature_counts.get(signature, 0) + count
+        return signature_counts
+
     def get_card(self, identifier: int) -> Card:
         """
         Finds the corresponding Card object based on its identifier.
         :param identifier: The identifier number of a Card object.
         :return: The Card object.
         """
-        card_index = self.card_ids.index(identifier)
-        card = self.cards[card_index]
-        return card
+        return self.card_lookup[identifier]
 
 
 class Moxfield:
     """
     A Moxfield URL and JSON object. Parses the deck link into a JSON if a link was provided.
+    If a DeckCache is given, recently fetched decks are read from disk and older ones are revalidated.
+    A shared Session and TokenBucket let many Moxfield objects reuse connections and share one rate limit.
     """
-    def __init__(self, moxfield_url):
+    def __init__(self, moxfield_url, cache: DeckCache = None, api_url: str = MOXFIELD_API_URL,
+                 session: requests.Session = None, rate_limiter: TokenBucket = None):
         self.__deck_url = moxfield_url
-        self.__api_url = self.__parse_moxfield_url()
+        self.__cache = cache
+        self.__session = session
+        self.__rate_limiter = rate_limiter
+        self.__deck_id = self.__parse_deck_id()
+        self.__api_url = f'{api_url}{self.__deck_id}'
         self.__moxfield_json = self.__moxfield_api_request()
 
     @property
@@ -252,37 +517,97 @@ class Moxfield:
         """
         return self.__moxfield_json
 
-    def __parse_moxfield_url(self) -> str:
+    def __parse_deck_id(self) -> str:
         """
-        Converts a regular deck link into an API call url.
-        :return: API call url.
+        Finds the deck ID in a regular deck link.
+        :return: Deck ID.
         """
         if 'moxfield' not in self.__deck_url:
             raise MoxfieldError(" > Not a Moxfield link.")
-        deck_id = self.__deck_url[self.__deck_url.find('decks/') + len('decks/'):]
-        return f'https://api.moxfield.com/v2/decks/all/{deck_id}'
+        return self.__deck_url[self.__deck_url.find('decks/') + len('decks/'):]
 
     def __moxfield_api_request(self) -> dict:
         """
-        Makes an API request to Moxfield for a deck's JSON.
+        Makes an API request to Moxfield for a deck's JSON, unless a fresh copy is cached.
         :return: JSON file.
         """
-        # DON'T MAKE TOO MANY API CALLS PER SECOND PLS
-        time.sleep(0.2)
+        cached = self.__cache.lookup(self.__deck_id) if self.__cache else None
+        if cached and cached['fresh']:
+            return cached['deck']
+
         try:
-            moxfield_response = requests.get(
-                headers={'User-Agent': read_ua()},
-                url=self.__api_url).text
-            if 'You are unable to access' in moxfield_response:
-                raise UserAgentError(" > You did not provide a whitelisted User-Agent.")
-            json_file = json.loads(moxfield_response)
-            try:
-                if len(json_file['commanders']) == 0:
-                    raise MoxfieldError(" > Your deck doesn't have any commanders, i.e. it is not a commander deck.")
-                return json_file
-            except KeyError:
-                raise MoxfieldError(f" > Your deck is probably set to private or it doesn't exist.")
+            headers = {'User-Agent': cached_user_agent()}
         except (NameError, FileNotFoundError):
             raise UserAgentError(" > User-Agent string or file not set properly. Modify user_agent.py, please.")
-        except ConnectionError as e:
-            raise ConnectionError(f" > Connection error. Here's the error code: {e}")
+        if cached and cached['etag']:
+            headers['If-None-Match'] = cached['etag']
+
+        response = self.__get_with_retries(headers)
+
+        # The cached copy is still valid
+        if cached and response.status_code == 304:
+            self.__cache.refresh(self.__deck_id)
+            return cached['deck']
+
+        json_file = parse_moxfield_response(response.text)
+        if self.__cache:
+            if cached and cached['last_updated'] and cached['last_updated'] == json_file.get('lastUpdatedAtUtc'):
+                # The deck hasn't been edited since it was cached
+                self.__cache.refresh(self.__deck_id)
+                return cached['deck']
+            self.__cache.store(self.__deck_id, json_file, response.headers.get('ETag'))
+        return json_file
+
+    def __get_with_retries(self, headers: dict) -> requests.Response:
+        """
+        Makes the GET request, retrying with exponential backoff while Moxfield is rate limiting or failing.
+        :param headers: Request headers.
+        :return: The response.
+        """
+        for attempt in range(0, MAX_RETRIES + 1):
+            # DON'T MAKE TOO MANY API CALLS PER SECOND PLS
+            if self.__rate_limiter:
+                self.__rate_limiter.acquire()
+            else:
+                time.sleep(0.2)
+            try:
+                response = (self.__session or requests).get(headers=headers, url=self.__api_url)
+            except requests.ConnectionError as e:
+                raise ConnectionError(f" > Connection error. Here's the error code: {e}")
+
+            if response.status_code != 429 and response.status_code < 500:
+                return response
+            if attempt == MAX_RETRIES:
+                break
+
+            # Respect Retry-After if Moxfield sends it in seconds
+            retry_after = response.headers.get('Retry-After', '')
+            time.sleep(float(retry_after) if retry_after.isdigit() else RETRY_BACKOFF * 2 ** attempt)
+
+        raise MoxfieldError(f" > Moxfield kept responding with status {response.status_code}. Try again later.")
+
+
+@lru_cache(maxsize=1)
+def cached_user_agent() -> str:
+    """
+    Reads the User-Agent once instead of reopening its file for every request.
+    :return: User-Agent string.
+    """
+    return read_ua()
+
+
+def parse_moxfield_response(moxfield_response: str) -> dict:
+    """
+    Parses and validates the text of a Moxfield API response.
+    :param moxfield_response: Response text.
+    :return: JSON file.
+    """
+    if 'You are unable to access' in moxfield_response:
+        raise UserAgentError(" > You did not provide a whitelisted User-Agent.")
+    json_file = json.loads(moxfield_response)
+    try:
+        if len(json_file['commanders']) == 0:
+            raise MoxfieldError(" > Your deck doesn't have any commanders, i.e. it is not a commander deck.")
+        return json_file
+    except KeyError:
+        raise MoxfieldError(f" > Your deck is probably set to private or it doesn't exist.")
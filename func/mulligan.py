@@ -0,0 +1,151 @@
+"""Mulligan policies: which opening hands are kept and which cards go to the bottom."""
+
+from math import comb
+
+# Cards in an opening hand
+OPENING_HAND_SIZE = 7
+
+
+class MulliganPolicy:
+    """
+    Keeps an opening hand with min_lands to max_lands lands and mulligans the others, at most max_mulligans times.
+    With the London mulligan every hand has 7 cards and one card per mulligan goes to the bottom, nonlands first
+    unless the hand has too many lands. Otherwise every mulligan draws one card fewer.
+    The first mulligan can be free (no card less). Which lands go to the bottom doesn't depend on what they produce.
+    A kept hand always has at least one card, so at most 6 mulligans cost a card.
+    """
+    def __init__(self, min_lands: int = 2, max_lands: int = 5, max_mulligans: int = 2, london: bool = True,
+                 free_first: bool = False):
+        self.__min_lands = min_lands
+        self.__max_lands = max_lands
+        self.__max_mulligans = max_mulligans
+        self.__london = london
+        self.__free_first = free_first
+
+        if max_mulligans < 0 or self.kept_size(max_mulligans) < 1:
+            raise ValueError(f"{max_mulligans} mulligans leave no cards in hand, "
+                             f"at most {OPENING_HAND_SIZE - 1 + int(free_first)} are possible.")
+
+    def __str__(self):
+        return (f"MulliganPolicy: keep {self.__min_lands}-{self.__max_lands} lands, "
+                f"up to {self.__max_mulligans} {'London' if self.__london else 'traditional'} mulligans"
+                f"{', the first one free' if self.__free_first else ''}")
+
+    def __eq__(self, other):
+        return isinstance(other, MulliganPolicy) and self.__key() == other.__key()
+
+    def __hash__(self):
+        return hash(self.__key())
+
+    def __key(self) -> tuple:
+        return self.__min_lands, self.__max_lands, self.__max_mulligans, self.__london, self.__free_first
+
+    @property
+    def max_mulligans(self) -> int:
+        """
+        Maximum number of mulligans property.
+        :return: Number of mulligans after which any hand is kept.
+        """
+        return self.__max_mulligans
+
+    def bottom_count(self, mulligan: int) -> int:
+        """
+        Number of cards a hand loses after a number of mulligans.
+        :param mulligan: Number of mulligans taken.
+        :return: Number of cards.
+        """
+        if self.__free_first and mulligan > 0:
+            mulligan -= 1
+        return min(mulligan, OPENING_HAND_SIZE)
+
+    def hand_size(self, mulligan: int) -> int:
+        """
+        Number of cards drawn for a hand after a number of mulligans.
+        :param mulligan: Number of mulligans taken.
+        :return: Number of cards.
+        """
+        if self.__london:
+            return OPENING_HAND_SIZE
+        return OPENING_HAND_SIZE - self.bottom_count(mulligan)
+
+    def keeps(self, lands: int, mulligan: int) -> bool:
+        """
+        Boolean for whether a hand is kept.
+        :param lands: Number of lands in the hand.
+        :param mulligan: Number of mulligans taken.
+        :return: True if the hand is kept, False if it is mulliganed.
+        """
+        return mulligan >= self.__max_mulligans or self.__min_lands <= lands <= self.__max_lands
+
+    def kept_lands(self, lands: int, mulligan: int) -> int:
+        """
+        Number of lands left in a kept hand after its cards went to the bottom.
+        :param lands: Number of lands in the hand.
+        :param mulligan: Number of mulligans taken.
+        :return: Number of lands.
+        """
+        if not self.__london:
+            return lands
+        bottom = self.bottom_count(mulligan)
+
+        # Lands above the maximum go first, then nonlands, then lands again if there aren't enough nonlands
+        land_bottoms = min(bottom, max(0, lands - self.__max_lands))
+        nonland_bottoms = min(bottom - land_bottoms, OPENING_HAND_SIZE - lands)
+        return lands - (bottom - nonland_bottoms)
+
+    def kept_size(self, mulligan: int) -> int:
+        """
+        Number of cards in a kept hand after its cards went to the bottom.
+        :param mulligan: Number of mulligans taken.
+        :return: Number of cards.
+        """
+        return OPENING_HAND_SIZE - self.bottom_count(mulligan)
+
+    def keep_hand(self, library: tuple, rng) -> tuple:
+        """
+        Shuffles and mulligans until a hand is kept.
+        :param library: The cards of the deck, signature indices with -1 for nonlands.
+        :param rng: The random generator used for shuffling.
+        :return: Tuple where the first value is the list of kept cards and the second value is the list of
+        the rest of the library, drawn from the end, with the cards sent to the bottom at its start.
+        """
+        mulligan = 0
+        while True:
+            shuffled = rng.sample(library, len(library))
+            hand_size = self.hand_size(mulligan)
+            hand = shuffled[-hand_size:]
+            del shuffled[-hand_size:]
+            lands = [card for card in hand if card >= 0]
+            if self.keeps(len(lands), mulligan):
+                break
+            mulligan += 1
+
+        # The hand is in random order, so its first lands and nonlands are a random choice
+        kept_lands = self.kept_lands(len(lands), mulligan)
+        nonlands = [card for card in hand if card < 0]
+        kept_nonlands = self.kept_size(mulligan) - kept_lands if self.__london else len(nonlands)
+        bottom = lands[kept_lands:] + nonlands[kept_nonlands:]
+        return lands[:kept_lands] + nonlands[:kept_nonlands], bottom + shuffled
+
+    def outcomes(self, land_count: int, deck_size: int) -> list:
+        """
+        Lists the possible kept hands with their probabilities.
+        :param land_count: Number of lands in the deck.
+        :param deck_size: Number of cards in the deck.
+        :return: A list of tuples of probability, number of cards drawn for the hand,
+        number of lands drawn and number of lands kept.
+        """
+        outcomes = []
+        reach = 1.0
+        for mulligan in range(0, self.__max_mulligans + 1):
+            hand_size = self.hand_size(mulligan)
+            mulligan_probability = 0.0
+            for lands in range(0, min(hand_size, land_count) + 1):
+                probability = (comb(land_count, lands) * comb(deck_size - land_count, hand_size - lands)
+                               / comb(deck_size, hand_size))
+                if self.keeps(lands, mulligan):
+                    outcomes.append((reach * probability, hand_size, lands, self.kept_lands(lands, mulligan)))
+                else:
+                    mulligan_probability += probability
+            reach *= mulligan_probability
+        return outcomes
@@ -0,0 +1,227 @@
+"""Land mix optimisation: swaps basics for candidate lands and compares the variants."""
+
+import random
+
+from func.cardpool import VerdictTable
+from func.compiled import CompiledDeck, compile_deck
+from func.exact import hit_probability
+from func.moxfield import DeckList, Card, fetchable_mask
+from func.parallel import chunk_sizes, chunk_seeds, run_chunks, shared_executor
+
+# Names of the basic lands that can be swapped for candidate lands
+BASIC_LAND_NAMES = ('Plains', 'Island', 'Swamp', 'Mountain', 'Forest', 'Wastes')
+
+
+def is_basic_land(card: Card) -> bool:
+    """
+    Boolean for whether the card is a basic land.
+    :param card: The Card object.
+    :return: True if basic, False if not.
+    """
+    return card.name in BASIC_LAND_NAMES or card.name.replace('Snow-Covered ', '') in BASIC_LAND_NAMES
+
+
+def optimise_land_mix(decklist: DeckList, candidates: list, budget: int, iterations: int = 20000,
+                      exact: bool = False, account_generic: bool = True, override_mt: list = None,
+                      executor=None, workers: int = None, seed=None) -> dict:
+    """
+    Finds the best land mix when up to budget basics are swapped for candidate lands, one swap at a time:
+    every round evaluates each remaining candidate in place of each kind of basic and keeps the best variant.
+    All variants are evaluated on the same shuffled libraries (common random numbers), so their differences
+    aren't lost in noise, and a variant only re-evaluates the games where a swapped card was drawn.
+    :param decklist: The DeckList object.
+    :param candidates: A list of candidate land Card objects, each of which can be added once.
+    Fetch candidates only find the deck's own lands of their types, like the deck's fetches.
+    Candidates that produce no mana are ignored.
+    :param budget: Maximum number of basics swapped for candidates.
+    :param iterations: Number of shuffled libraries every variant is evaluated on.
+    :param exact: True to evaluate every variant with the exact probability instead of the shuffles.
+    :param account_generic: True (default) if you're looking to hit your commander's manas. False if colours are enough.
+    :param override_mt: A custom list of manas if you want to override the commander-based mana target.
+    :param executor: An Executor to run the chunks on. None to create a process pool.
+    :param workers: Number of worker processes. None for one per CPU, 1 to run in this process.
+    :param seed: Seed of the shuffles. None for a random seed.
+    :return: Dict of commander_names (list), list of manas (list), probability (float) and swaps
+    (list of (basic name, candidate name) tuples) of the best variant, and variants (list of dicts of swaps
+    and probability), every variant that was evaluated.
+    """
+    deck = compile_deck(decklist)
+
+    if override_mt:
+        mana_target = override_mt
+    else:
+        mana_target = deck.get_mana_target()
+
+    commander_names = list(deck.names)
+
+    # Fetch candidates are restricted without changing the Card objects, which belong to the caller
+    fetchable_lands = [card for card in decklist.card_lookup.values()
+                       if card.card_category == 'land' and not card.is_fetch()]
+    useful_candidates = []
+    candidate_masks = []
+    for candidate in candidates:
+        if candidate.is_fetch():
+            mask = fetchable_mask(candidate.fetch_mask, fetchable_lands)
+        else:
+            mask = candidate.mana_produced_mask
+        if mask:
+            useful_candidates.append(candidate)
+            candidate_masks.append(mask)
+    candidates = useful_candidates
+
+    # The candidates' signatures are added after the deck's ones so that every variant shares one signature list
+    signatures = list(deck.signatures)
+    candidate_signature_ids = []
+    for mask in candidate_masks:
+        signature = tuple((mask >> index) & 1 for index in range(0, 7))
+        if signature not in signatures:
+            signatures.append(signature)
+        candidate_signature_ids.append(signatures.index(signature))
+
+    # Positions of each kind of basic in the library, the last ones are swapped first
+    basic_positions = {}
+    for position, identifier in enumerate(decklist.card_ids):
+        card = decklist.get_card(identifier)
+        if is_basic_land(card):
+            basic_positions.setdefault(card.name, []).append(position)
+
+    base = CompiledDeck(names=deck.names, mana_target=deck.get_mana_target(), signatures=signatures,
+                        library=deck.library)
+    sizes = chunk_sizes(iterations)
+    seeds = chunk_seeds(len(sizes), seed)
+
+    current = []
+    best_probability = None
+    evaluated = []
+
+    with shared_executor(executor, workers) as sweep_executor:
+        for _ in range(0, budget + 1):
+            # The first round only evaluates the deck as it is
+            if best_probability is None:
+                variants = [[]]
+            else:
+                variants = next_variants(current, candidates, candidate_signature_ids, basic_positions)
+            if not variants:
+                break
+
+            swap_lists = [[(position, signature_id) for _, _, position, signature_id in variant]
+                          for variant in variants]
+            if exact:
+                probabilities = run_chunks(exact_variant_probability,
+                                           [(base, swaps, mana_target, account_generic) for swaps in swap_lists],
+                                           sweep_executor, workers)
+            else:
+                chunk_args = [(base, swap_lists, mana_target, account_generic, size, chunk_seed)
+                              for size, chunk_seed in zip(sizes, seeds)]
+                successes = [sum(variant_successes) for variant_successes in
+                             zip(*run_chunks(sweep_chunk, chunk_args, sweep_executor, workers))]
+                probabilities = [variant_success / iterations for variant_success in successes]
+
+            for variant, probability in zip(variants, probabilities):
+                evaluated.append({'swaps': [(basic, candidate) for basic, candidate, _, _ in variant],
+                                  'probability': probability})
+
+            # Stop when no swap improves on the current mix
+            probability, variant = max(zip(probabilities, variants), key=lambda pair: pair[0])
+            if best_probability is not None and probability <= best_probability:
+                break
+            best_probability = probability
+            current = variant
+
+    return {'names': commander_names, 'mana_target': mana_target, 'probability': best_probability,
+            'swaps': [(basic, candidate) for basic, candidate, _, _ in current], 'variants': evaluated}
+
+
+def next_variants(current: list, candidates: list, candidate_signature_ids: list, basic_positions: dict) -> list:
+    """
+    Lists the variants that make one more swap than the current one.
+    :param current: The current variant, a list of (basic name, candidate name, position, signature index) swaps.
+    :param candidates: A list of candidate land Card objects.
+    :param candidate_signature_ids: Signature index of each candidate.
+    :param basic_positions: A dict of basic name to the library positions of its copies.
+    :return: A list of variants.
+    """
+    used_candidates = [candidate for _, candidate, _, _ in current]
+    used_positions = [position for _, _, position, _ in current]
+    variants = []
+    for candidate, signature_id in zip(candidates, candidate_signature_ids):
+        if candidate.name in used_candidates:
+            continue
+        for basic, positions in basic_positions.items():
+            free_positions = [position for position in positions if position not in used_positions]
+            if free_positions:
+                variants.append(current + [(basic, candidate.name, free_positions[-1], signature_id)])
+    return variants
+
+
+def exact_variant_probability(base: CompiledDeck, swaps: list, mana_target: list, generic: bool) -> float:
+    """
+    Calculates the exact probability of hitting the mana target on curve with a variant of the deck.
+    :param base: The CompiledDeck object with every candidate's signature.
+    :param swaps: A list of (library position, new signature index) tuples.
+    :param mana_target: A list containing the mana target.
+    :param generic: True if generic mana is accounted for, False if not.
+    :return: The probability.
+    """
+    library = list(base.library)
+    for position, signature_id in swaps:
+        library[position] = signature_id
+    variant = CompiledDeck(names=base.names, mana_target=base.get_mana_target(), signatures=base.signatures,
+                           library=library)
+
+    balance = mana_target[:]
+    if not generic:
+        balance[0] = 0
+    return hit_probability(variant, balance, sum(mana_target) + 7)
+
+
+def sweep_chunk(base: CompiledDeck, swap_lists: list, mana_target: list, generic: bool, iterations: int,
+                seed: int) -> list:
+    """
+    Plays a chunk of games once and checks every variant of the deck against the same shuffles.
+    A variant's hand only differs from the deck's hand by the swapped cards that were drawn,
+    so its key is the deck's key plus the difference of those cards' increments.
+    :param base: The CompiledDeck object with every candidate's signature.
+    :param swap_lists: A list of variants, each a list of (library position, new signature index) tuples.
+    :param mana_target: A list containing the mana target.
+    :param generic: True if generic mana is accounted for, False if not.
+    :param iterations: Number of games.
+    :param seed: Seed of the chunk's random generator.
+    :return: A list of the number of successful games of each variant.
+    """
+    rng = random.Random(seed)
+    library = base.library
+    draws = sum(mana_target) + 7
+
+    # The deck's counts plus the most lands any variant adds to a signature bound the keys
+    signature_totals = [0] * len(base.signatures)
+    for signature_id in library:
+        if signature_id >= 0:
+            signature_totals[signature_id] += 1
+    added = [0] * len(base.signatures)
+    for swaps in swap_lists:
+        for signature_id in set(signature_id for _, signature_id in swaps):
+            count = sum(1 for _, swapped_id in swaps if swapped_id == signature_id)
+            added[signature_id] = max(added[signature_id], count)
+    signature_totals = [total + extra for total, extra in zip(signature_totals, added)]
+    table = VerdictTable(base.signature_masks, signature_totals, mana_target, generic)
+    increments = table.increments + (0,)
+
+    # Key differences of each swap, nonlands (index -1) add the trailing 0
+    swap_deltas = [[(position, increments[signature_id] - increments[library[position]])
+                    for position, signature_id in swaps] for swaps in swap_lists]
+
+    successes = [0] * len(swap_lists)
+    for _ in range(0, iterations):
+        hand = set(rng.sample(range(0, len(library)), draws))
+        key = 0
+        for position in hand:
+            key += increments[library[position]]
+        for index, deltas in enumerate(swap_deltas):
+            variant_key = key
+            for position, delta in deltas:
+                if position in hand:
+                    variant_key += delta
+            if table.verdict(variant_key):
+                successes[index] += 1
+    return successes
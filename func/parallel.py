@@ -0,0 +1,78 @@
+"""Splits simulations into chunks and runs them on a process pool."""
+
+import random
+from contextlib import contextmanager
+from concurrent.futures import Executor, ProcessPoolExecutor
+
+# Number of games per chunk. The chunks (and their seeds) never depend on the number of workers,
+# so the merged results don't either.
+CHUNK_SIZE = 1000
+
+
+def chunk_sizes(iterations: int, chunk_size: int = CHUNK_SIZE) -> list:
+    """
+    Splits a number of iterations into chunks.
+    :param iterations: Total number of iterations.
+    :param chunk_size: Maximum number of iterations in a chunk.
+    :return: A list of the number of iterations in each chunk.
+    """
+    return [min(chunk_size, iterations - start) for start in range(0, iterations, chunk_size)]
+
+
+def chunk_seeds(chunk_count: int, seed=None) -> list:
+    """
+    Derives an independent seed for each chunk's random number generator.
+    :param chunk_count: Number of chunks.
+    :param seed: The seed of the whole run. None for a random seed.
+    :return: A list of seeds (int).
+    """
+    seed_generator = random.Random(seed)
+    return [seed_generator.getrandbits(64) for _ in range(0, chunk_count)]
+
+
+def resolve_seed(seed=None) -> int:
+    """
+    Picks a random seed for a run when none is given, so that the run can be repeated with the returned seed.
+    :param seed: The seed of the run or None.
+    :return: The seed.
+    """
+    if seed is None:
+        return random.SystemRandom().getrandbits(64)
+    return seed
+
+
+def run_chunks(function, chunk_args: list, executor: Executor = None, workers: int = None) -> list:
+    """
+    Runs a function once per chunk, on an executor if one is given, on a new process pool if not.
+    :param function: A picklable (module level) function.
+    :param chunk_args: A list of argument tuples, one per chunk.
+    :param executor: An Executor to run the chunks on. None to create a ProcessPoolExecutor.
+    :param workers: Number of worker processes for the new process pool. None for one per CPU, 1 to run in this process.
+    :return: A list of the results in chunk order.
+    """
+    if not chunk_args:
+        return []
+
+    if executor:
+        return list(executor.map(function, *zip(*chunk_args)))
+
+    if workers == 1 or len(chunk_args) <= 1:
+        return [function(*args) for args in chunk_args]
+
+    with ProcessPoolExecutor(max_workers=workers) as process_pool:
+        return list(process_pool.map(function, *zip(*chunk_args)))
+
+
+@contextmanager
+def shared_executor(executor: Executor = None, workers: int = None):
+    """
+    Keeps one executor alive for a block that calls run_chunks many times.
+    :param executor: An Executor to use. None to create a ProcessPoolExecutor.
+    :param workers: Number of worker processes for the new process pool. None for one per CPU, 1 to run in this process.
+    :return: The given executor, the new process pool or None if the chunks should run in this process.
+    """
+    if executor or workers == 1:
+        yield executor
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as process_pool:
+            yield process_pool
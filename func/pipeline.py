@@ -0,0 +1,179 @@
+"""Streaming pipeline that runs the simulations on deck JSON records read from a JSON lines file."""
+
+import json
+import os
+from collections import deque
+
+import func.probabilities as prob
+from func.exceptions import MoxfieldError, UserAgentError
+from func.parallel import chunk_seeds, shared_executor
+
+# Errors of a single deck that are written into its result instead of stopping the pipeline
+DECK_ERRORS = (MoxfieldError, UserAgentError, RuntimeError, KeyError, TypeError, ValueError)
+
+
+def run_simulation(deck_json: dict, mana_target: list, mode: str, iterations: int = None, seed: int = None,
+                   executor=None) -> dict:
+    """
+    Runs the exact calculation or, if a number of iterations is given, the Monte Carlo simulation.
+    :param deck_json: Deck JSON.
+    :param mana_target: Mana target, all zeros for the commander-based one.
+    :param mode: Simulation mode: p, t or b.
+    :param iterations: Number of Monte Carlo games. None for the exact calculation.
+    :param seed: Seed of the Monte Carlo simulation.
+    :param executor: An Executor for the Monte Carlo chunks. None to run them in this process.
+    :return: The result dict of the simulation.
+    """
+    if iterations is None:
+        if mode == 'p':
+            return prob.probability_simulation(deck_json=deck_json, target=mana_target)
+        elif mode == 't':
+            return prob.turn_count_simulation(deck_json=deck_json, target=mana_target)
+        return prob.both_simulation(deck_json=deck_json, target=mana_target)
+
+    override_mt = mana_target if sum(mana_target) else None
+    if mode == 'p':
+        simulate = prob.simulate_probability
+    elif mode == 't':
+        simulate = prob.simulate_turns
+    else:
+        simulate = prob.simulate_both
+    return simulate(iterations=iterations, deck_json=deck_json, override_mt=override_mt, executor=executor,
+                    workers=1 if executor is None else None, seed=seed)
+
+
+def result_row(source: str, result: dict = None, error: Exception = None) -> dict:
+    """
+    Builds one output row.
+    :param source: Deck URL, file or ID.
+    :param result: The result dict of the simulation, None if it failed.
+    :param error: The exception that stopped the deck, None on success.
+    :return: Dict with the deck, the result fields and the error message.
+    """
+    row = {'deck': source}
+    if result:
+        row.update(result)
+    row['error'] = str(error).strip() if error else None
+    return row
+
+
+def read_lines(stream, start: int = 0):
+    """
+    Reads the non-empty lines of a JSON lines stream one at a time.
+    :param stream: A text stream, e.g. an open file or sys.stdin.
+    :param start: Number of the first line to read, the lines before it are skipped.
+    :return: Generator of (line number, line) tuples.
+    """
+    for line_number, line in enumerate(stream):
+        if line_number >= start and line.strip():
+            yield line_number, line
+
+
+def record_seed(seed, line_number: int):
+    """
+    Derives the seed of one record from the seed of the run and the record's line number, so that the decks
+    don't share a shuffle stream and a resumed run gives every record the same seed as a full run.
+    :param seed: The seed of the run. None for a random seed per record.
+    :param line_number: Number of the record's line in the input.
+    :return: The seed of the record (int) or None.
+    """
+    if seed is None:
+        return None
+    return chunk_seeds(1, f'{seed}:{line_number}')[0]
+
+
+def process_line(line_number: int, line: str, mana_target: list, mode: str, iterations: int = None,
+                 seed: int = None) -> dict:
+    """
+    Parses one deck JSON record and runs the simulation on it in this process.
+    :param line_number: Number of the line in the input.
+    :param line: The deck JSON record, as returned by Moxfield.moxfield_json.
+    :param mana_target: Mana target, all zeros for the commander-based one.
+    :param mode: Simulation mode: p, t or b.
+    :param iterations: Number of Monte Carlo games. None for the exact calculation.
+    :param seed: Seed of the Monte Carlo simulation.
+    :return: The output row, with the line number.
+    """
+    source, result, error = None, None, None
+    try:
+        deck_json = json.loads(line)
+        if not isinstance(deck_json, dict):
+            raise ValueError(f"Line {line_number} is not a deck JSON object.")
+        source = deck_json.get('publicId')
+        result = run_simulation(deck_json, mana_target, mode, iterations, seed)
+    except DECK_ERRORS as e:
+        error = e
+    return {'line': line_number, **result_row(source, result, error)}
+
+
+def resume_offset(output_path: str) -> int:
+    """
+    Finds where an interrupted pipeline should continue. A partly written last row is removed from the output.
+    :param output_path: Path of the JSON lines output of the interrupted pipeline.
+    :return: Number of the first input line that has no result yet, 0 if there is no output.
+    """
+    if not os.path.exists(output_path):
+        return 0
+
+    offset = 0
+    valid_bytes = 0
+    with open(output_path, 'rb') as output_file:
+        for line in output_file:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                break
+            if not line.endswith(b'\n'):
+                break
+            offset = row['line'] + 1
+            valid_bytes += len(line)
+
+    with open(output_path, 'r+b') as output_file:
+        output_file.truncate(valid_bytes)
+    return offset
+
+
+def run_pipeline(input_stream, output_stream, mana_target: list, mode: str, iterations: int = None,
+                 seed: int = None, workers: int = None, start: int = 0, max_pending: int = None) -> int:
+    """
+    Runs the simulation on every deck JSON record of a JSON lines stream and writes one JSON line per record
+    as soon as it and the records before it are done, so the output keeps the input order and can be resumed.
+    Only max_pending records are read ahead, which keeps the memory use bounded for any number of decks.
+    :param input_stream: Text stream of deck JSON records, one per line.
+    :param output_stream: Text stream for the results.
+    :param mana_target: Mana target, all zeros for the commander-based one.
+    :param mode: Simulation mode: p, t or b.
+    :param iterations: Number of Monte Carlo games per deck. None for the exact calculation.
+    :param seed: Seed of the run. Every record is simulated with its own seed derived from this one and its
+    line number by record_seed, so results don't depend on the start line. None for random seeds.
+    :param workers: Number of worker processes, each simulating one deck at a time.
+    None for one per CPU, 1 to run in this process.
+    :param start: Number of the first input line to process, e.g. from resume_offset.
+    :param max_pending: Maximum number of records in flight. None for twice the number of workers.
+    :return: Number of records that failed.
+    """
+    failed = 0
+
+    def write(row: dict):
+        nonlocal failed
+        failed += row['error'] is not None
+        output_stream.write(json.dumps(row) + '\n')
+        output_stream.flush()
+
+    with shared_executor(workers=workers) as executor:
+        if executor is None:
+            for line_number, line in read_lines(input_stream, start):
+                write(process_line(line_number, line, mana_target, mode, iterations, record_seed(seed, line_number)))
+            return failed
+
+        limit = max_pending or 2 * (workers or os.cpu_count() or 1)
+        pending = deque()
+        for line_number, line in read_lines(input_stream, start):
+            pending.append(executor.submit(process_line, line_number, line, mana_target, mode, iterations,
+                                           record_seed(seed, line_number)))
+            if len(pending) >= limit:
+                write(pending.popleft().result())
+        while pending:
+            write(pending.popleft().result())
+
+    return failed
@@ -1,135 +1,879 @@
 """Probability and simulation functions."""
 
-import asyncio
 import random
+from concurrent.futures import Executor
+from math import sqrt
+from statistics import NormalDist
 
+from func.compiled import CompiledDeck, compile_deck
 from func.moxfield import DeckList
-from func.cardpool import success
+from func.cardpool import VerdictTable, success_from_counts
+from func.exact import exact_probability, exact_turns, hit_probabilities
+from func.mana import MANA_FIELD_BITS, MANA_FIELD_MASK, MANA_ORDER, pack_mana, popcount, signature_mask, unpack_mana
+from func.mulligan import MulliganPolicy
+from func.parallel import chunk_sizes, chunk_seeds, resolve_seed, run_chunks, shared_executor
 
+# Number of games per chunk in the adaptive simulations, small so that easy decks can stop early
+ADAPTIVE_CHUNK_SIZE = 250
 
-def probability_simulation(deck_json: dict, target: list) -> dict:
+# Manas of the colour availability curves, each alone and in pairs
+AVAILABILITY_COLOURS = 'wubrgc'
+
+
+def probability_simulation(deck_json: dict, target: list, exact: bool = True, tolerance: float = None,
+                           seed=None, workers: int = None, mulligan: MulliganPolicy = None) -> dict:
     """
-    Calls the simulate_probability function. If list of manas has custom settings
+    Calls the exact_probability function or, if exact is set to False, the simulate_probability function
+    (adaptive_probability if a tolerance is given). If list of manas has custom settings
     it calls the function with those parameters.
     :param deck_json: The deck's JSON file.
     :param target: List of manas.
+    :param exact: True (default) to calculate the exact probability. False to run the Monte Carlo simulation instead.
+    :param tolerance: Half-width of the confidence interval where the Monte Carlo simulation stops. None for 5000 games.
+    :param seed: Seed of the Monte Carlo simulation. None for a random seed, which is returned in the result
+    so that the run can be repeated. The same seed gives the same result with any number of workers.
+    :param workers: Number of worker processes of the Monte Carlo simulation. None for one per CPU.
+    :param mulligan: A MulliganPolicy for the opening hand. None to keep any 7 cards.
     :return: Default probability if no mana target, override if a custom mana target was provided.
     """
-    if not sum(target) == 0:
-        return asyncio.run(simulate_probability(iterations=5000, deck_json=deck_json, override_mt=target))
-    return asyncio.run(simulate_probability(iterations=5000, deck_json=deck_json))
+    if exact:
+        if not sum(target) == 0:
+            return exact_probability(deck_json=deck_json, override_mt=target, mulligan=mulligan)
+        return exact_probability(deck_json=deck_json, mulligan=mulligan)
 
+    seed = resolve_seed(seed)
+    override_mt = target if not sum(target) == 0 else None
+    if tolerance:
+        result = adaptive_probability(deck_json=deck_json, tolerance=tolerance, override_mt=override_mt,
+                                      workers=workers, seed=seed, mulligan=mulligan)
+    else:
+        result = simulate_probability(iterations=5000, deck_json=deck_json, override_mt=override_mt,
+                                      workers=workers, seed=seed, mulligan=mulligan)
+    result['seed'] = seed
+    return result
 
 
-async def simulate_probability(iterations: int, deck_json: dict,
-                               account_generic: bool = True, override_mt: list = None) -> dict:
+def simulate_probability(iterations: int, deck_json: dict, account_generic: bool = True, override_mt: list = None,
+                         executor: Executor = None, workers: int = None, seed=None,
+                         mulligan: MulliganPolicy = None) -> dict:
     """
     Simulates the probability of hitting your mana target on curve.
+    The games are split into chunks that run on a process pool, each chunk with its own seeded random generator.
     :param iterations: Number of iterations for the simulation. A good starting point is 1k.
-    :param deck_json: The JSON file of the deck.
+    :param deck_json: The JSON file of the deck, its DeckList or its CompiledDeck.
     :param account_generic: True (default) if you're looking to hit your commander's manas. False if colours are enough.
     :param override_mt: A custom list of manas if you want to override the commander-based mana target.
+    :param executor: An Executor to run the chunks on. None to create a process pool.
+    :param workers: Number of worker processes. None for one per CPU, 1 to run in this process.
+    :param seed: Seed of the simulation. None for a random seed.
+    :param mulligan: A MulliganPolicy for the opening hand. None to keep any 7 cards.
     :return: Dict of commander_names (list), probability (float), list of manas (list).
     """
-    decklist = DeckList(deck_json=deck_json)
+    deck = compile_deck(deck_json)
 
     if override_mt:
         mana_target = override_mt
     else:
-        mana_target = decklist.get_mana_target()
+        mana_target = deck.get_mana_target()
 
-    commander_names = []
-    for commander_card in decklist.commanders:
-        commander_names.append(commander_card.name)
+    commander_names = list(deck.names)
 
-    counts = [single_probability_iteration(decklist, account_generic, mana_target) for _ in range(0, iterations)]
-    successes: list = await asyncio.gather(*counts)
+    sizes = chunk_sizes(iterations)
+    seeds = chunk_seeds(len(sizes), seed)
+    chunk_args = [(deck, account_generic, mana_target, size, chunk_seed, mulligan)
+                  for size, chunk_seed in zip(sizes, seeds)]
+    successes = run_chunks(probability_chunk, chunk_args, executor, workers)
 
     return {'names': commander_names, 'probability': (sum(successes) / iterations), 'mana_target': mana_target}
 
 
-async def single_probability_iteration(deck_list: DeckList, generic: bool, mana_target: list) -> int:
+def probability_chunk(deck: CompiledDeck, generic: bool, mana_target: list, iterations: int, seed: int,
+                      mulligan: MulliganPolicy = None) -> int:
+    """
+    Plays a chunk of games with its own random generator.
+    :param deck: The CompiledDeck object that the games are based on.
+    :param generic: True is generic mana is accounted for, False if not.
+    :param mana_target: A list containing the mana target.
+    :param iterations: Number of games.
+    :param seed: Seed of the chunk's random generator.
+    :param mulligan: A MulliganPolicy for the opening hand. None to keep any 7 cards.
+    :return: Number of successful games.
+    """
+    rng = random.Random(seed)
+    table = deck.get_verdict_table(mana_target, generic)
+    return sum(single_probability_iteration(deck, generic, mana_target, rng, table, mulligan)
+               for _ in range(0, iterations))
+
+
+def single_probability_iteration(deck: CompiledDeck, generic: bool, mana_target: list,
+                                 rng: random.Random = random, table: VerdictTable = None,
+                                 mulligan: MulliganPolicy = None) -> int:
     """
     Plays a single game.
-    :param deck_list: The DeckList object that th game is based on.
+    :param deck: The CompiledDeck object that the game is based on.
     :param generic: True is generic mana is accounted for, False if not.
     :param mana_target: A list containing the mana target.
+    :param rng: The random generator used for shuffling.
+    :param table: The deck's VerdictTable for the mana target. None to get it from the deck.
+    :param mulligan: A MulliganPolicy for the opening hand. None to keep any 7 cards.
     :return: If the game was a success return 1, otherwise 0.
     """
-    deck_ids = random.sample(deck_list.card_ids, len(deck_list.card_ids))
-    hand_ids = []
-    draws = sum(mana_target) + 7
+    if table is None:
+        table = deck.get_verdict_table(mana_target, generic)
+    increments = table.increments
 
-    for _ in range(0, draws):
-        draw_id = deck_ids[-1]
-        hand_ids.append(draw_id)
-        deck_ids.pop()
+    # The hand is the last cards of the shuffled library (or the kept hand and the next cards), keyed by its land counts
+    if mulligan:
+        hand, library = mulligan.keep_hand(deck.library, rng)
+        cards = hand + library[len(library) - sum(mana_target):]
+    else:
+        library = rng.sample(deck.library, deck.deck_size)
+        cards = library[-(sum(mana_target) + 7):]
+    key = 0
+    for signature_id in cards:
+        if signature_id >= 0:
+            key += increments[signature_id]
 
-    if success(deck_list, mana_target, hand_ids, generic):
+    if table.verdict(key):
         return 1
     return 0
 
 
-def turn_count_simulation(deck_json: dict, target: list) -> dict:
+def adaptive_probability(deck_json: dict, tolerance: float = 0.01, confidence: float = 0.95,
+                         batch_size: int = 500, max_iterations: int = 1000000, account_generic: bool = True,
+                         override_mt: list = None, executor: Executor = None, workers: int = None, seed=None,
+                         mulligan: MulliganPolicy = None) -> dict:
+    """
+    Simulates the probability of hitting your mana target on curve in batches of games
+    until the Wilson confidence interval is narrow enough.
+    :param deck_json: The JSON file of the deck, its DeckList or its CompiledDeck.
+    :param tolerance: The simulation stops when the half-width of the confidence interval is at most this.
+    :param confidence: Confidence level of the interval.
+    :param batch_size: Number of games played between checks of the interval.
+    :param max_iterations: The simulation stops after this many games even if the interval is still too wide.
+    :param account_generic: True (default) if you're looking to hit your commander's manas. False if colours are enough.
+    :param override_mt: A custom list of manas if you want to override the commander-based mana target.
+    :param executor: An Executor to run the chunks on. None to create a process pool.
+    :param workers: Number of worker processes. None for one per CPU, 1 to run in this process.
+    :param seed: Seed of the simulation. None for a random seed.
+    :param mulligan: A MulliganPolicy for the opening hand. None to keep any 7 cards.
+    :return: Dict of commander_names (list), probability (float), list of manas (list),
+    confidence_interval (tuple) and iterations (int), the number of games played.
+    """
+    deck = compile_deck(deck_json)
+
+    if override_mt:
+        mana_target = override_mt
+    else:
+        mana_target = deck.get_mana_target()
+
+    commander_names = list(deck.names)
+
+    # Batches are split into chunks that don't depend on the number of workers
+    seed_generator = random.Random(seed)
+    successes = 0
+    iterations = 0
+    interval = (0.0, 1.0)
+    with shared_executor(executor, workers) as batch_executor:
+        while iterations < max_iterations:
+            sizes = chunk_sizes(min(batch_size, max_iterations - iterations), ADAPTIVE_CHUNK_SIZE)
+            chunk_args = [(deck, account_generic, mana_target, size, seed_generator.getrandbits(64), mulligan)
+                          for size in sizes]
+            successes += sum(run_chunks(probability_chunk, chunk_args, batch_executor, workers))
+            iterations += sum(sizes)
+
+            interval = wilson_interval(successes, iterations, confidence)
+            if (interval[1] - interval[0]) / 2 <= tolerance:
+                break
+
+    return {'names': commander_names, 'probability': (successes / iterations), 'mana_target': mana_target,
+            'confidence_interval': interval, 'iterations': iterations}
+
+
+def wilson_interval(successes: int, iterations: int, confidence: float) -> tuple:
+    """
+    Calculates the Wilson score interval of a simulated probability.
+    :param successes: Number of successful games.
+    :param iterations: Number of games.
+    :param confidence: Confidence level of the interval.
+    :return: Tuple of the lower and upper bound.
     """
-    Calls the simulate_turns function. If list of manas has custom settings
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    probability = successes / iterations
+    denominator = 1 + z ** 2 / iterations
+    centre = (probability + z ** 2 / (2 * iterations)) / denominator
+    half_width = z * sqrt(probability * (1 - probability) / iterations + z ** 2 / (4 * iterations ** 2)) / denominator
+    return max(0.0, centre - half_width), min(1.0, centre + half_width)
+
+
+def turn_count_simulation(deck_json: dict, target: list, exact: bool = True, tolerance: float = None,
+                          seed=None, workers: int = None, mulligan: MulliganPolicy = None) -> dict:
+    """
+    Calls the exact_turns function or, if exact is set to False, the simulate_turns function
+    (adaptive_turns if a tolerance is given). If list of manas has custom settings
     it calls the function with those parameters.
     :param deck_json: The deck's JSON file.
     :param target: List of manas.
+    :param exact: True (default) to calculate the exact turn distribution. False to run the Monte Carlo simulation.
+    :param tolerance: Standard error of the turn count where the Monte Carlo simulation stops. None for 5000 games.
+    :param seed: Seed of the Monte Carlo simulation. None for a random seed, which is returned in the result
+    so that the run can be repeated. The same seed gives the same result with any number of workers.
+    :param workers: Number of worker processes of the Monte Carlo simulation. None for one per CPU.
+    :param mulligan: A MulliganPolicy for the opening hand. None to keep any 7 cards.
     :return: Default probability if no mana target, override if a custom mana target was provided.
     """
-    if not sum(target) == 0:
-        return asyncio.run(simulate_turns(iterations=5000, deck_json=deck_json, override_mt=target))
-    return asyncio.run(simulate_turns(iterations=5000, deck_json=deck_json))
+    if exact:
+        if not sum(target) == 0:
+            return exact_turns(deck_json=deck_json, override_mt=target, mulligan=mulligan)
+        return exact_turns(deck_json=deck_json, mulligan=mulligan)
+
+    seed = resolve_seed(seed)
+    override_mt = target if not sum(target) == 0 else None
+    if tolerance:
+        result = adaptive_turns(deck_json=deck_json, tolerance=tolerance, override_mt=override_mt,
+                                workers=workers, seed=seed, mulligan=mulligan)
+    else:
+        result = simulate_turns(iterations=5000, deck_json=deck_json, override_mt=override_mt,
+                                workers=workers, seed=seed, mulligan=mulligan)
+    result['seed'] = seed
+    return result
 
 
-async def simulate_turns(iterations: int, deck_json: dict,
-                         account_generic: bool = True, override_mt: list = None) -> dict:
+def simulate_turns(iterations: int, deck_json: dict, account_generic: bool = True, override_mt: list = None,
+                   executor: Executor = None, workers: int = None, seed=None,
+                   mulligan: MulliganPolicy = None) -> dict:
     """
     Simulates the number of turns it takes to hit your mana target.
+    The games are split into chunks that run on a process pool, each chunk with its own seeded random generator.
     :param iterations: Number of iterations for the simulation.
-    :param deck_json: The JSON file of the deck.
+    :param deck_json: The JSON file of the deck, its DeckList or its CompiledDeck.
     :param account_generic: True (default) if you're looking to hit your commander's manas. False if colours are enough.
     :param override_mt: A custom list of manas if you want to override the commander-based mana target.
+    :param executor: An Executor to run the chunks on. None to create a process pool.
+    :param workers: Number of worker processes. None for one per CPU, 1 to run in this process.
+    :param seed: Seed of the simulation. None for a random seed.
+    :param mulligan: A MulliganPolicy for the opening hand. None to keep any 7 cards.
     :return: A Dict of commander_names (list), turns (float), list of manas (list).
     """
-
-    decklist = DeckList(deck_json=deck_json)
+    deck = compile_deck(deck_json)
 
     if override_mt:
         mana_target = override_mt
     else:
-        mana_target = decklist.get_mana_target()
+        mana_target = deck.get_mana_target()
 
-    commander_names = []
-    for commander_card in decklist.commanders:
-        commander_names.append(commander_card.name)
+    commander_names = list(deck.names)
 
-    counts = [single_turns_iteration(decklist, account_generic, mana_target) for _ in range(0, iterations)]
-    turn_counts = await asyncio.gather(*counts)
+    sizes = chunk_sizes(iterations)
+    seeds = chunk_seeds(len(sizes), seed)
+    chunk_args = [(deck, account_generic, mana_target, size, chunk_seed, mulligan)
+                  for size, chunk_seed in zip(sizes, seeds)]
+    turn_counts = [turn_count for chunk in run_chunks(turns_chunk, chunk_args, executor, workers)
+                   for turn_count in chunk]
 
     return {'names': commander_names, 'turns': (sum(turn_counts) / iterations), 'mana_target': mana_target}
 
 
-async def single_turns_iteration(deck_list: DeckList, generic: bool, mana_target: list) -> int:
+def turns_chunk(deck: CompiledDeck, generic: bool, mana_target: list, iterations: int, seed: int,
+                mulligan: MulliganPolicy = None) -> int:
+    """
+    Plays a chunk of games with its own random generator.
+    :param deck: The CompiledDeck object that the games are based on.
+    :param generic: True is generic mana is accounted for, False if not.
+    :param mana_target: A list containing the mana target.
+    :param iterations: Number of games.
+    :param seed: Seed of the chunk's random generator.
+    :param mulligan: A MulliganPolicy for the opening hand. None to keep any 7 cards.
+    :return: A list of the turn counts of the games.
+    """
+    rng = random.Random(seed)
+    table = deck.get_verdict_table(mana_target, generic)
+    return [single_turns_iteration(deck, generic, mana_target, rng, table, mulligan)
+            for _ in range(0, iterations)]
+
+
+def single_turns_iteration(deck: CompiledDeck, generic: bool, mana_target: list,
+                           rng: random.Random = random, table: VerdictTable = None,
+                           mulligan: MulliganPolicy = None) -> int:
     """
     Plays a single game.
-    :param deck_list: The DeckList object that th game is based on.
+    :param deck: The CompiledDeck object that the game is based on.
     :param generic: True is generic mana is accounted for, False if not.
     :param mana_target: A list containing the mana target.
+    :param rng: The random generator used for shuffling.
+    :param table: The deck's VerdictTable for the mana target. None to get it from the deck.
+    :param mulligan: A MulliganPolicy for the opening hand. None to keep any 7 cards.
+    With a policy the kept hand counts as 7 cards drawn, however many cards it has.
     :return: Turn count at success.
     """
-    deck_ids = random.sample(deck_list.card_ids, len(deck_list.card_ids))
-    hand_ids = []
-    draw_count = 0
+    if table is None:
+        table = deck.get_verdict_table(mana_target, generic)
+    increments = table.increments
+    key = 0
+    if mulligan:
+        hand, library = mulligan.keep_hand(deck.library, rng)
+        for signature_id in hand:
+            if signature_id >= 0:
+                key += increments[signature_id]
+        draw_count = 7
+    else:
+        library = rng.sample(deck.library, deck.deck_size)
+        draw_count = 0
 
-    while not success(deck_list, mana_target, hand_ids, generic):
-        draw_id = deck_ids[-1]
-        hand_ids.append(draw_id)
-        deck_ids.pop()
+    # The hand is kept as the key of its land counts that is updated one draw at a time
+    while not table.verdict(key):
+        signature_id = library.pop()
+        if signature_id >= 0:
+            key += increments[signature_id]
         draw_count += 1
         if draw_count > 50:
             raise RuntimeError("Your simulation has drawn more than 50 cards. "
                                "Are you sure you have enough lands that can produce appropriate colours?")
 
     return draw_count - 7
+
+
+def adaptive_turns(deck_json: dict, tolerance: float = 0.05, confidence: float = 0.95,
+                   batch_size: int = 500, max_iterations: int = 1000000, account_generic: bool = True,
+                   override_mt: list = None, executor: Executor = None, workers: int = None, seed=None,
+                   mulligan: MulliganPolicy = None) -> dict:
+    """
+    Simulates the number of turns it takes to hit your mana target in batches of games
+    until the standard error of the mean turn count is small enough.
+    :param deck_json: The JSON file of the deck, its DeckList or its CompiledDeck.
+    :param tolerance: The simulation stops when the standard error of the mean is at most this.
+    :param confidence: Confidence level of the reported interval.
+    :param batch_size: Number of games played between checks of the standard error.
+    :param max_iterations: The simulation stops after this many games even if the standard error is still too big.
+    :param account_generic: True (default) if you're looking to hit your commander's manas. False if colours are enough.
+    :param override_mt: A custom list of manas if you want to override the commander-based mana target.
+    :param executor: An Executor to run the chunks on. None to create a process pool.
+    :param workers: Number of worker processes. None for one per CPU, 1 to run in this process.
+    :param seed: Seed of the simulation. None for a random seed.
+    :param mulligan: A MulliganPolicy for the opening hand. None to keep any 7 cards.
+    :return: A Dict of commander_names (list), turns (float), list of manas (list), standard_error (float),
+    confidence_interval (tuple) and iterations (int), the number of games played.
+    """
+    deck = compile_deck(deck_json)
+
+    if override_mt:
+        mana_target = override_mt
+    else:
+        mana_target = deck.get_mana_target()
+
+    commander_names = list(deck.names)
+
+    # Batches are split into chunks that don't depend on the number of workers
+    seed_generator = random.Random(seed)
+    turns_sum = 0
+    turns_square_sum = 0
+    iterations = 0
+    standard_error = float('inf')
+    with shared_executor(executor, workers) as batch_executor:
+        while iterations < max_iterations:
+            sizes = chunk_sizes(min(batch_size, max_iterations - iterations), ADAPTIVE_CHUNK_SIZE)
+            chunk_args = [(deck, account_generic, mana_target, size, seed_generator.getrandbits(64), mulligan)
+                          for size in sizes]
+            for chunk in run_chunks(turns_chunk, chunk_args, batch_executor, workers):
+                turns_sum += sum(chunk)
+                turns_square_sum += sum(turn_count ** 2 for turn_count in chunk)
+            iterations += sum(sizes)
+
+            if iterations > 1:
+                variance = (turns_square_sum - turns_sum ** 2 / iterations) / (iterations - 1)
+                standard_error = sqrt(max(variance, 0.0) / iterations)
+                if standard_error <= tolerance:
+                    break
+
+    mean = turns_sum / iterations
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+
+    return {'names': commander_names, 'turns': mean, 'mana_target': mana_target, 'standard_error': standard_error,
+            'confidence_interval': (mean - z * standard_error, mean + z * standard_error), 'iterations': iterations}
+
+
+def both_simulation(deck_json: dict, target: list, exact: bool = True, seed=None, workers: int = None,
+                    mulligan: MulliganPolicy = None) -> dict:
+    """
+    Calls the exact_turns function or, if exact is set to False, the simulate_both function, which both give
+    the probability and the turn count from one pass. If list of manas has custom settings
+    it calls the function with those parameters.
+    :param deck_json: The deck's JSON file.
+    :param target: List of manas.
+    :param exact: True (default) to calculate both exactly. False to run the Monte Carlo simulation.
+    :param seed: Seed of the Monte Carlo simulation. None for a random seed, which is returned in the result
+    so that the run can be repeated. The same seed gives the same result with any number of workers.
+    :param workers: Number of worker processes of the Monte Carlo simulation. None for one per CPU.
+    :param mulligan: A MulliganPolicy for the opening hand. None to keep any 7 cards.
+    :return: Default probability and turn count if no mana target, override if a custom mana target was provided.
+    """
+    if exact:
+        if not sum(target) == 0:
+            return exact_turns(deck_json=deck_json, override_mt=target, mulligan=mulligan)
+        return exact_turns(deck_json=deck_json, mulligan=mulligan)
+
+    seed = resolve_seed(seed)
+    override_mt = target if not sum(target) == 0 else None
+    result = simulate_both(iterations=5000, deck_json=deck_json, override_mt=override_mt, workers=workers, seed=seed,
+                           mulligan=mulligan)
+    result['seed'] = seed
+    return result
+
+
+def simulate_both(iterations: int, deck_json: dict, account_generic: bool = True, override_mt: list = None,
+                  executor: Executor = None, workers: int = None, seed=None,
+                  mulligan: MulliganPolicy = None) -> dict:
+    """
+    Simulates both the probability of hitting your mana target on curve and the number of turns it takes.
+    Every game is played once until the target is hit, the game was on curve if that took at most
+    as many turns as the target has mana.
+    :param iterations: Number of iterations for the simulation.
+    :param deck_json: The JSON file of the deck, its DeckList or its CompiledDeck.
+    :param account_generic: True (default) if you're looking to hit your commander's manas. False if colours are enough.
+    :param override_mt: A custom list of manas if you want to override the commander-based mana target.
+    :param executor: An Executor to run the chunks on. None to create a process pool.
+    :param workers: Number of worker processes. None for one per CPU, 1 to run in this process.
+    :param seed: Seed of the simulation. None for a random seed.
+    :param mulligan: A MulliganPolicy for the opening hand. None to keep any 7 cards.
+    :return: A Dict of commander_names (list), probability (float), turns (float), list of manas (list).
+    """
+    deck = compile_deck(deck_json)
+
+    if override_mt:
+        mana_target = override_mt
+    else:
+        mana_target = deck.get_mana_target()
+
+    commander_names = list(deck.names)
+
+    sizes = chunk_sizes(iterations)
+    seeds = chunk_seeds(len(sizes), seed)
+    chunk_args = [(deck, account_generic, mana_target, size, chunk_seed, mulligan)
+                  for size, chunk_seed in zip(sizes, seeds)]
+    turn_counts = [turn_count for chunk in run_chunks(turns_chunk, chunk_args, executor, workers)
+                   for turn_count in chunk]
+    on_curve = sum(1 for turn_count in turn_counts if turn_count <= sum(mana_target))
+
+    return {'names': commander_names, 'probability': (on_curve / iterations), 'turns': (sum(turn_counts) / iterations),
+            'mana_target': mana_target}
+
+
+def simulate_targets(iterations: int, deck_json: dict, mana_targets: list, account_generic: bool = True,
+                     executor: Executor = None, workers: int = None, seed=None) -> dict:
+    """
+    Simulates the probability of hitting each of many mana targets on curve, all on the same shuffled libraries.
+    Every game draws its cards once, in the order of the targets' hand sizes, and checks each target
+    as soon as its hand is complete.
+    :param iterations: Number of iterations for the simulation.
+    :param deck_json: The JSON file of the deck, its DeckList or its CompiledDeck.
+    :param mana_targets: A list of lists of manas.
+    :param account_generic: True (default) if you're looking to hit the generic manas too. False if colours are enough.
+    :param executor: An Executor to run the chunks on. None to create a process pool.
+    :param workers: Number of worker processes. None for one per CPU, 1 to run in this process.
+    :param seed: Seed of the simulation. None for a random seed.
+    :return: Dict of commander_names (list), probabilities (list of floats, one per target), mana_targets (list).
+    """
+    deck = compile_deck(deck_json)
+    commander_names = list(deck.names)
+    mana_targets = [list(mana_target) for mana_target in mana_targets]
+
+    sizes = chunk_sizes(iterations)
+    seeds = chunk_seeds(len(sizes), seed)
+    chunk_args = [(deck, account_generic, mana_targets, size, chunk_seed) for size, chunk_seed in zip(sizes, seeds)]
+    successes = [sum(target_successes) for target_successes in
+                 zip(*run_chunks(targets_chunk, chunk_args, executor, workers))]
+
+    return {'names': commander_names, 'probabilities': [success / iterations for success in successes],
+            'mana_targets': mana_targets}
+
+
+def targets_chunk(deck: CompiledDeck, generic: bool, mana_targets: list, iterations: int, seed: int) -> list:
+    """
+    Plays a chunk of games with its own random generator and checks every mana target in each game.
+    :param deck: The CompiledDeck object that the games are based on.
+    :param generic: True is generic mana is accounted for, False if not.
+    :param mana_targets: A list of lists of manas.
+    :param iterations: Number of games.
+    :param seed: Seed of the chunk's random generator.
+    :return: A list of the number of successful games of each target.
+    """
+    rng = random.Random(seed)
+    tables = [deck.get_verdict_table(mana_target, generic) for mana_target in mana_targets]
+    draws = [sum(mana_target) + 7 for mana_target in mana_targets]
+    order = sorted(range(0, len(mana_targets)), key=lambda index: draws[index])
+
+    # The tables of one deck all pack hands the same way, so one key serves every target
+    increments = tables[0].increments if tables else ()
+
+    successes = [0] * len(mana_targets)
+    for _ in range(0, iterations):
+        library = rng.sample(deck.library, deck.deck_size)
+        key = 0
+        drawn = 0
+        for index in order:
+            # The hand is the last cards of the shuffled library, drawn up to this target's hand size
+            while drawn < draws[index]:
+                signature_id = library[-1 - drawn]
+                if signature_id >= 0:
+                    key += increments[signature_id]
+                drawn += 1
+            if tables[index].verdict(key):
+                successes[index] += 1
+    return successes
+
+
+def castable_on_curve(deck_json: dict, exact: bool = True, iterations: int = 5000, account_generic: bool = True,
+                      executor: Executor = None, workers: int = None, seed=None) -> dict:
+    """
+    Calculates, for every nonland card of the deck, the probability of being able to cast it on curve,
+    i.e. of hitting its mana cost with lands only. Cards that share a mana cost are evaluated once.
+    Cards without a mana cost (including double faced cards) are left out.
+    :param deck_json: The JSON file of the deck or its DeckList.
+    :param exact: True (default) to calculate the exact probabilities. False to run one Monte Carlo simulation
+    for all the cards.
+    :param iterations: Number of iterations for the Monte Carlo simulation.
+    :param account_generic: True (default) if you're looking to hit the generic manas too. False if colours are enough.
+    :param executor: An Executor to run the chunks on. None to create a process pool.
+    :param workers: Number of worker processes. None for one per CPU, 1 to run in this process.
+    :param seed: Seed of the simulation. None for a random seed.
+    :return: Dict of commander_names (list) and cards (list of dicts of name, mana_target and probability).
+    """
+    decklist = deck_json if isinstance(deck_json, DeckList) else DeckList(deck_json=deck_json)
+    deck = compile_deck(decklist)
+    commander_names = list(deck.names)
+
+    # Unique mana costs of the nonlands, in deck order
+    card_targets = []
+    mana_targets = []
+    for card in decklist.card_lookup.values():
+        mana_target = list(card.mana_cost.values())
+        if card.card_category == 'nonland' and sum(mana_target) > 0:
+            card_targets.append((card.name, mana_target))
+            if mana_target not in mana_targets:
+                mana_targets.append(mana_target)
+
+    if exact:
+        probabilities = [exact_probability(deck_json=deck, account_generic=account_generic,
+                                           override_mt=mana_target)['probability'] for mana_target in mana_targets]
+    else:
+        probabilities = simulate_targets(iterations=iterations, deck_json=deck, mana_targets=mana_targets,
+                                         account_generic=account_generic, executor=executor, workers=workers,
+                                         seed=seed)['probabilities']
+
+    cards = [{'name': name, 'mana_target': mana_target, 'probability': probabilities[mana_targets.index(mana_target)]}
+             for name, mana_target in card_targets]
+    return {'names': commander_names, 'cards': cards}
+
+
+def colour_availability(deck_json: dict, turns: int = 10, exact: bool = True, iterations: int = 5000,
+                        executor: Executor = None, workers: int = None, seed=None) -> dict:
+    """
+    Calculates, for every turn from 1 to turns, the probability of having each colour (and colourless) available
+    and of having each pair of them available together, i.e. of being able to pay one mana of each.
+    Turn t has 7 + t cards drawn, like in turn_count_simulation.
+    :param deck_json: The JSON file of the deck, its DeckList or its CompiledDeck.
+    :param turns: Number of turns.
+    :param exact: True (default) to calculate the exact probabilities. False to simulate them, all on the same
+    shuffled libraries.
+    :param iterations: Number of iterations for the Monte Carlo simulation.
+    :param executor: An Executor to run the chunks on. None to create a process pool.
+    :param workers: Number of worker processes. None for one per CPU, 1 to run in this process.
+    :param seed: Seed of the simulation. None for a random seed.
+    :return: Dict of commander_names (list), turns (list), colours (dict of mana to a list of probabilities,
+    one per turn) and pairs (dict of two manas, e.g. 'wu', to a list of probabilities, one per turn).
+    """
+    deck = compile_deck(deck_json)
+    commander_names = list(deck.names)
+    turns = min(turns, deck.deck_size - 7)
+
+    # Balances of one mana of each colour and of each pair of colours
+    names = []
+    balances = []
+    for first, colour in enumerate(AVAILABILITY_COLOURS):
+        for other in ['', *AVAILABILITY_COLOURS[first + 1:]]:
+            balance = [0, 0, 0, 0, 0, 0, 0]
+            for mana in colour + other:
+                balance[MANA_ORDER.index(mana)] = 1
+            names.append(colour + other)
+            balances.append(balance)
+
+    if exact:
+        curves = [hit_probabilities(deck, balance, [7 + turn for turn in range(1, turns + 1)]) for balance in balances]
+    else:
+        sizes = chunk_sizes(iterations)
+        seeds = chunk_seeds(len(sizes), seed)
+        chunk_args = [(deck, balances, turns, size, chunk_seed) for size, chunk_seed in zip(sizes, seeds)]
+        chunks = run_chunks(availability_chunk, chunk_args, executor, workers)
+        curves = [[sum(chunk[index][turn] for chunk in chunks) / iterations for turn in range(0, turns)]
+                  for index in range(0, len(balances))]
+
+    colours = {name: curve for name, curve in zip(names, curves) if len(name) == 1}
+    pairs = {name: curve for name, curve in zip(names, curves) if len(name) == 2}
+    return {'names': commander_names, 'turns': list(range(1, turns + 1)), 'colours': colours, 'pairs': pairs}
+
+
+def availability_chunk(deck: CompiledDeck, balances: list, turns: int, iterations: int, seed: int) -> list:
+    """
+    Plays a chunk of games with its own random generator and finds the first turn each balance is available.
+    A balance stays available once it is, so every game checks each balance only until it first is.
+    :param deck: The CompiledDeck object that the games are based on.
+    :param balances: A list of balances.
+    :param turns: Number of turns.
+    :param iterations: Number of games.
+    :param seed: Seed of the chunk's random generator.
+    :return: A list per balance of the number of games where it was available by each turn.
+    """
+    rng = random.Random(seed)
+    signature_totals = [0] * len(deck.signatures)
+    for signature_id in deck.library:
+        if signature_id >= 0:
+            signature_totals[signature_id] += 1
+
+    # The tables of one deck all pack hands the same way, so one key serves every balance
+    tables = [VerdictTable(deck.signature_masks, signature_totals, balance, True) for balance in balances]
+    increments = tables[0].increments if tables else ()
+
+    first_hits = [[0] * turns for _ in balances]
+    for _ in range(0, iterations):
+        library = rng.sample(deck.library, deck.deck_size)
+        key = 0
+        for signature_id in library[-7:]:
+            if signature_id >= 0:
+                key += increments[signature_id]
+
+        # Verdicts only change on the first turn and when a land is drawn
+        unavailable = list(range(0, len(balances)))
+        for turn in range(0, turns):
+            signature_id = library[-8 - turn]
+            if signature_id >= 0:
+                key += increments[signature_id]
+            elif turn > 0:
+                continue
+            still_unavailable = []
+            for index in unavailable:
+                if tables[index].verdict(key):
+                    first_hits[index][turn] += 1
+                else:
+                    still_unavailable.append(index)
+            unavailable = still_unavailable
+            if not unavailable:
+                break
+
+    # Available by a turn means first available on that turn or earlier
+    hits = []
+    for balance_hits in first_hits:
+        cumulative = 0
+        curve = []
+        for turn_hits in balance_hits:
+            cumulative += turn_hits
+            curve.append(cumulative)
+        hits.append(curve)
+    return hits
+
+
+def simulate_ramp_turns(iterations: int, deck_json: dict, account_generic: bool = True, override_mt: list = None,
+                        ramp: bool = True, executor: Executor = None, workers: int = None, seed=None,
+                        mulligan: MulliganPolicy = None) -> dict:
+    """
+    Simulates the turn on which your commander can first be cast, playing one land per turn and casting mana rocks,
+    mana dorks and land search spells as soon as they are affordable. Their mana is counted on the turns after
+    (rocks on the same turn). Lands that enter tapped are counted from the turn after they are played.
+    Turn t has 7 + t cards drawn, like in simulate_turns, but only t lands played.
+    :param iterations: Number of iterations for the simulation.
+    :param deck_json: The JSON file of the deck, its DeckList or its CompiledDeck.
+    :param account_generic: True (default) if you're looking to hit your commander's manas. False if colours are enough.
+    :param override_mt: A custom list of manas if you want to override the commander-based mana target.
+    :param ramp: True (default) to cast ramp. False to play lands only, which is the baseline that ramp improves on.
+    :param executor: An Executor to run the chunks on. None to create a process pool.
+    :param workers: Number of worker processes. None for one per CPU, 1 to run in this process.
+    :param seed: Seed of the simulation. None for a random seed.
+    :param mulligan: A MulliganPolicy for the opening hand. None to keep any 7 cards.
+    :return: A Dict of commander_names (list), turns (float), list of manas (list) and probability (float)
+    of casting the commander by the turn equal to its mana value.
+    """
+    deck = compile_deck(deck_json)
+
+    if override_mt:
+        mana_target = override_mt
+    else:
+        mana_target = deck.get_mana_target()
+
+    commander_names = list(deck.names)
+
+    sizes = chunk_sizes(iterations)
+    seeds = chunk_seeds(len(sizes), seed)
+    chunk_args = [(deck, account_generic, mana_target, ramp, size, chunk_seed, mulligan)
+                  for size, chunk_seed in zip(sizes, seeds)]
+    turn_counts = [turn_count for chunk in run_chunks(ramp_chunk, chunk_args, executor, workers)
+                   for turn_count in chunk]
+    on_curve = sum(1 for turn_count in turn_counts if turn_count <= sum(mana_target))
+
+    return {'names': commander_names, 'turns': (sum(turn_counts) / iterations), 'mana_target': mana_target,
+            'probability': (on_curve / iterations)}
+
+
+def ramp_tables(deck: CompiledDeck, mana_target: list, generic: bool, ramp: bool) -> tuple:
+    """
+    Precomputes everything a ramp game needs so that no card is looked at twice.
+    Lands and ramp cards are both mana sources: a verdict table keys the sources in play by land signature
+    and by ramp record, a ramp card adding its amount of mana to its record's count.
+    Lands that enter tapped get their own codes after the untapped ones, with the same signature's increment.
+    :param deck: The CompiledDeck object that the games are based on.
+    :param mana_target: A list containing the mana target.
+    :param generic: True if generic mana is accounted for, False if not.
+    :param ramp: True to cast ramp, False to treat ramp cards as other nonlands.
+    :return: Tuple of the library codes (signature index for untapped lands, number of signatures + signature
+    index for tapped lands, -2 - record index for ramp, -1 otherwise), the number of signatures, the VerdictTable,
+    the source masks, the play priority and key increment of each land code, and the packed cost, total cost,
+    mana amount, key increment and delay of each ramp record.
+    """
+    producers = deck.producers if ramp else ()
+    signature_count = len(deck.signatures)
+    codes = []
+    for signature_id, producer_id, tapped in zip(deck.library, deck.producer_library, deck.tapped_library):
+        if signature_id >= 0:
+            codes.append(signature_id + signature_count * tapped)
+        elif producer_id >= 0 and ramp:
+            codes.append(-2 - producer_id)
+        else:
+            codes.append(-1)
+
+    source_masks = tuple(deck.signature_masks) + tuple(mask for _, mask, _, _ in producers)
+    source_totals = [0] * len(source_masks)
+    for code in codes:
+        if code >= 0:
+            source_totals[code % signature_count] += 1
+        elif code <= -2:
+            source_totals[signature_count - 2 - code] += producers[-2 - code][2]
+    # Costs paid and the target on top of them are packed sums bounded by the mana of every source together
+    if sum(source_totals) + sum(mana_target) > MANA_FIELD_MASK:
+        raise ValueError(f"The deck's mana and the mana target don't fit in {MANA_FIELD_BITS} bit packed mana.")
+    table = VerdictTable(source_masks, source_totals, mana_target, generic)
+    increments = table.increments
+
+    # Lands producing more of the required colours are played first
+    required_mask = signature_mask(mana_target)
+    priorities = tuple((popcount(mask & required_mask), popcount(mask)) for mask in deck.signature_masks) * 2
+    land_increments = increments[:signature_count] * 2
+
+    costs = tuple(cost for cost, _, _, _ in producers)
+    cost_totals = tuple(sum(unpack_mana(cost)) for cost in costs)
+    producer_increments = tuple(increments[signature_count + producer_id] * amount
+                                for producer_id, (_, _, amount, _) in enumerate(producers))
+    amounts = tuple(amount for _, _, amount, _ in producers)
+    delays = tuple(delay for _, _, _, delay in producers)
+    return (codes, signature_count, table, source_masks, priorities, land_increments, costs, cost_totals, amounts,
+            producer_increments, delays)
+
+
+def ramp_chunk(deck: CompiledDeck, generic: bool, mana_target: list, ramp: bool, iterations: int, seed: int,
+               mulligan: MulliganPolicy = None) -> list:
+    """
+    Plays a chunk of ramp games with its own random generator.
+    :param deck: The CompiledDeck object that the games are based on.
+    :param generic: True is generic mana is accounted for, False if not.
+    :param mana_target: A list containing the mana target.
+    :param ramp: True to cast ramp, False to play lands only.
+    :param iterations: Number of games.
+    :param seed: Seed of the chunk's random generator.
+    :param mulligan: A MulliganPolicy for the opening hand. None to keep any 7 cards.
+    :return: A list of the turn counts of the games.
+    """
+    rng = random.Random(seed)
+    tables = ramp_tables(deck, mana_target, generic, ramp)
+    return [single_ramp_iteration(tables, generic, mana_target, rng, mulligan) for _ in range(0, iterations)]
+
+
+def single_ramp_iteration(tables: tuple, generic: bool, mana_target: list, rng: random.Random = random,
+                          mulligan: MulliganPolicy = None) -> int:
+    """
+    Plays a single game turn by turn: draw, play a land, then cast the commander if possible or otherwise
+    the ramp cards in hand from the cheapest, as long as the sources in play can pay for all of them.
+    The land played is the best untapped land if it lets the commander be cast this turn, otherwise
+    a tapped land while there are any, so that untapped lands are kept for later turns.
+    A land search adds its mana like any other ramp card but the land it finds stays in the library,
+    so decks with many searches draw lands a little more often than they would.
+    :param tables: The precomputed tables made by ramp_tables.
+    :param generic: True is generic mana is accounted for, False if not.
+    :param mana_target: A list containing the mana target.
+    :param rng: The random generator used for shuffling.
+    :param mulligan: A MulliganPolicy for the opening hand. None to keep any 7 cards.
+    :return: Turn count at success.
+    """
+    (codes, signature_count, table, source_masks, priorities, land_increments, costs, cost_totals, amounts,
+     producer_increments, delays) = tables
+    packed_target = pack_mana([mana_target[0] if generic else 0] + list(mana_target[1:]))
+
+    if mulligan:
+        hand, library = mulligan.keep_hand(codes, rng)
+    else:
+        # A game never draws more than 50 cards, so only those are shuffled
+        library = rng.sample(codes, min(50, len(codes)))
+        hand = library[-7:]
+        del library[-7:]
+    lands = [code for code in hand if code >= 0]
+    producers = [-2 - code for code in hand if code <= -2]
+
+    # Sources in play are kept as the key of their counts and their total mana,
+    # ramp that isn't usable yet waits with its turn
+    key = 0
+    mana = 0
+    pending = []
+    turn = 0
+    while True:
+        turn += 1
+        if 7 + turn > 50:
+            raise RuntimeError("Your simulation has drawn more than 50 cards. "
+                               "Are you sure you have enough lands that can produce appropriate colours?")
+        if not library:
+            raise RuntimeError("Your simulation has drawn every card of the deck. "
+                               "Are you sure you have enough lands that can produce appropriate colours?")
+        code = library.pop()
+        if code >= 0:
+            lands.append(code)
+        elif code <= -2:
+            producers.append(-2 - code)
+
+        if pending:
+            for usable, increment, amount in pending:
+                if usable <= turn:
+                    key += increment
+                    mana += amount
+            pending = [(usable, increment, amount) for usable, increment, amount in pending if usable > turn]
+
+        if lands:
+            untapped = [land for land in lands if land < signature_count]
+            land = max(untapped, key=priorities.__getitem__) if untapped else None
+            if land is not None and table.verdict(key + land_increments[land]):
+                return turn
+            if len(untapped) < len(lands):
+                land = max([land for land in lands if land >= signature_count], key=priorities.__getitem__)
+                pending.append((turn + 1, land_increments[land], 1))
+            else:
+                key += land_increments[land]
+                mana += 1
+            lands.remove(land)
+
+        if table.verdict(key):
+            return turn
+
+        # Ramp is paid together, so every cast checks that the sources can pay all of this turn's costs
+        # The total mana is checked first, which rules out most unaffordable ramp without the colour check
+        spent = 0
+        spent_total = 0
+        for producer_id in sorted(producers, key=cost_totals.__getitem__):
+            if spent_total + cost_totals[producer_id] > mana:
+                break
+            if success_from_counts(source_masks, table.counts(key), unpack_mana(spent + costs[producer_id]), True):
+                spent += costs[producer_id]
+                spent_total += cost_totals[producer_id]
+                producers.remove(producer_id)
+                if delays[producer_id]:
+                    pending.append((turn + delays[producer_id], producer_increments[producer_id], amounts[producer_id]))
+                else:
+                    key += producer_increments[producer_id]
+                    mana += amounts[producer_id]
+
+        # Rocks that tap for mana straight away can help cast the commander on the same turn
+        if spent and success_from_counts(source_masks, table.counts(key), unpack_mana(spent + packed_target), True):
+            return turn
@@ -91,11 +91,10 @@ def simulation(deck_json: dict, mana_target: list, mode: str):
         print(f"\n   Commanders: {cmdr_txt}\n   Mana target: {mana_target_text}\n   Turn count: {turns_txt}.")
 
     else:
-        p = prob.probability_simulation(deck_json=deck_json, target=mana_target)
-        t = prob.turn_count_simulation(deck_json=deck_json, target=mana_target)
-        cmdr_txt = q_text.commander_names(p['names'])
-        mana_target_text = q_text.mana_target_text(p['mana_target'])
-        prob_txt = f'''{int(round(p['probability'], 2) * 100)} %'''
-        turns_txt = f'''{round(t['turns'], 1)}'''
+        b = prob.both_simulation(deck_json=deck_json, target=mana_target)
+        cmdr_txt = q_text.commander_names(b['names'])
+        mana_target_text = q_text.mana_target_text(b['mana_target'])
+        prob_txt = f'''{int(round(b['probability'], 2) * 100)} %'''
+        turns_txt = f'''{round(b['turns'], 1)}'''
         print(f"\n   Commanders: {cmdr_txt}\n   Mana target: {mana_target_text}\n   Probability: {prob_txt} "
               f"| Turn count: {turns_txt}.")
@@ -1,6 +1,8 @@
 """Logic functions for queries."""
 
 from func.exceptions import ExitException, SkipException, InvalidInputError
+from func.cache import DeckCache
+from func.mana import MANA_FIELD_MASK
 from func.moxfield import Moxfield
 
 
@@ -58,7 +60,8 @@ def json_query(moxfield_url_input: str) -> dict:
     # Moxfield raises its own errors so no input error handling
     if moxfield_url_input.lower() == 'exit':
         raise ExitException(" > Exit command was given.")
-    deck_json = Moxfield(moxfield_url_input).moxfield_json
+    with DeckCache() as cache:
+        deck_json = Moxfield(moxfield_url_input, cache=cache).moxfield_json
     return deck_json
 
 
@@ -84,28 +87,29 @@ def parse_custom_mana_target(mana_text_input: str) -> list:
     :param mana_text_input: A string that describes the new mana target in terms of '#wubrgc'.
     :return: New list of manas.
     """
+    return mana_target_from_text(mana_text_input)
+
+
+def mana_target_from_text(mana_text: str) -> list:
+    """
+    Parses a mana target without prompting for input again, e.g. from command line arguments.
+    :param mana_text: A string that describes the mana target in terms of '#wubrgc'.
+    :return: List of manas.
+    """
     mana_target = [0, 0, 0, 0, 0, 0, 0]
 
-    for char in mana_text_input:
+    for char in mana_text.lower():
         if char.isnumeric():
             mana_target[0] += int(char)
-        elif char.lower() in 'wubrgc':
-            if char == 'w':
-                mana_target[1] += 1
-            elif char == 'u':
-                mana_target[2] += 1
-            elif char == 'b':
-                mana_target[3] += 1
-            elif char == 'r':
-                mana_target[4] += 1
-            elif char == 'g':
-                mana_target[5] += 1
-            elif char == 'c':
-                mana_target[6] += 1
+        elif char in 'wubrgc':
+            mana_target['awubrgc'.index(char)] += 1
         else:
             raise InvalidInputError(" > Erroneous input when defining a custom mana target. "
                                     "Make sure all characters are numbers 1-9 or in 'wubrgca'. "
                                     "Please try again or enter 'skip' or 'exit'.")
+    if max(mana_target) > MANA_FIELD_MASK:
+        raise InvalidInputError(f" > A custom mana target can have at most {MANA_FIELD_MASK} of each mana. "
+                                "Please try again or enter 'skip' or 'exit'.")
     return mana_target
 
 
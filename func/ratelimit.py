@@ -0,0 +1,32 @@
+"""Rate limiting for API requests shared between threads."""
+
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket. Tokens are refilled at a steady rate up to the capacity
+    and every request takes one token, waiting for it if the bucket is empty.
+    """
+    def __init__(self, rate: float, capacity: float = 1):
+        self.__rate = rate
+        self.__capacity = capacity
+        self.__tokens = capacity
+        self.__updated = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Takes one token, sleeping until one is available.
+        """
+        while True:
+            with self.__lock:
+                now = time.monotonic()
+                self.__tokens = min(self.__capacity, self.__tokens + (now - self.__updated) * self.__rate)
+                self.__updated = now
+                if self.__tokens >= 1:
+                    self.__tokens -= 1
+                    return
+                wait = (1 - self.__tokens) / self.__rate
+            time.sleep(wait)
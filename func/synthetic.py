@@ -0,0 +1,184 @@
+"""Synthetic deck JSONs in the shape of Moxfield's, for running the simulations offline."""
+
+# Basic land names by colour
+BASIC_NAMES = {'W': 'Plains', 'U': 'Island', 'B': 'Swamp', 'R': 'Mountain', 'G': 'Forest'}
+
+# Cards in a commander deck besides the commanders
+MAINBOARD_SIZE = 99
+
+
+def card_json(name: str, type_line: str, colour_identity: list, oracle_text: str = '', mana_cost: str = '',
+              mana_value: int = 0) -> dict:
+    """
+    Creates the JSON of a card with the fields that DeckList reads.
+    :param name: Card name.
+    :param type_line: Type line, e.g. 'Basic Land — Forest'.
+    :param colour_identity: List of colour letters, e.g. ['G'].
+    :param oracle_text: Oracle text.
+    :param mana_cost: Mana cost, e.g. '{2}{G}'.
+    :param mana_value: Mana value.
+    :return: The card JSON.
+    """
+    return {'name': name, 'type_line': type_line, 'color_identity': colour_identity, 'oracle_text': oracle_text,
+            'mana_cost': mana_cost, 'cmc': mana_value}
+
+
+def basic_json(colour: str) -> dict:
+    """
+    Creates the JSON of a basic land.
+    :param colour: Colour letter, e.g. 'G'.
+    :return: The card JSON.
+    """
+    name = BASIC_NAMES[colour]
+    return card_json(name, f'Basic Land — {name}', [colour], f'({{T}}: Add {{{colour}}}.)')
+
+
+def dual_json(colours: str) -> dict:
+    """
+    Creates the JSON of a dual land with both basic land types, like the shock lands.
+    :param colours: Two colour letters, e.g. 'UG'.
+    :return: The card JSON.
+    """
+    first, second = colours
+    return card_json(f'{BASIC_NAMES[first]} {BASIC_NAMES[second]} Shock', f'Land — {BASIC_NAMES[first]} '
+                     f'{BASIC_NAMES[second]}', [first, second],
+                     f'({{T}}: Add {{{first}}} or {{{second}}}.)\nAs this land enters the battlefield, you may pay '
+                     f"2 life. If you don't, it enters the battlefield tapped.")
+
+
+def fetch_json(colours: str) -> dict:
+    """
+    Creates the JSON of a fetch land that searches for either of two basic land types.
+    :param colours: Two colour letters, e.g. 'UB'.
+    :return: The card JSON.
+    """
+    first, second = colours
+    return card_json(f'{BASIC_NAMES[first]} {BASIC_NAMES[second]} Fetch', 'Land', [],
+                     f'{{T}}, Pay 1 life, Sacrifice this land: Search your library for a {BASIC_NAMES[first]} or '
+                     f'{BASIC_NAMES[second]} card, put it onto the battlefield, then shuffle.')
+
+
+def tapland_json(colours: str) -> dict:
+    """
+    Creates the JSON of a land that enters tapped and taps for either of two colours.
+    :param colours: Two colour letters, e.g. 'WG'.
+    :return: The card JSON.
+    """
+    first, second = colours
+    return card_json(f'{colours} Gate', 'Land — Gate', [first, second],
+                     f'This land enters the battlefield tapped.\n{{T}}: Add {{{first}}} or {{{second}}}.')
+
+
+def ramp_jsons(colour: str) -> list:
+    """
+    Creates the JSONs of a few common ramp cards.
+    :param colour: A colour letter of the deck for the coloured ramp.
+    :return: A list of card JSONs.
+    """
+    return [card_json('Sol Ring', 'Artifact', [], '{T}: Add {C}{C}.', '{1}', 1),
+            card_json('Arcane Signet', 'Artifact', [],
+                      "{T}: Add one mana of any color in your commander's color identity.", '{2}', 2),
+            card_json('Mind Stone', 'Artifact', [], '{T}: Add {C}.\n{1}, {T}, Sacrifice Mind Stone: Draw a card.',
+                      '{2}', 2),
+            card_json(f'{BASIC_NAMES[colour]} Search', 'Sorcery', [colour],
+                      'Search your library for a basic land card, put that card onto the battlefield tapped, '
+                      'then shuffle.', f'{{1}}{{{colour}}}', 2)]
+
+
+def deck_json(commanders: list, lands: list, nonlands: list = ()) -> dict:
+    """
+    Creates a deck JSON and fills the mainboard up to 99 cards with vanilla spells of the commanders' colours.
+    Parsed cards are cached by name, so a name is only ever given to one card in all synthetic decks.
+    :param commanders: A list of commander card JSONs.
+    :param lands: A list of (card JSON, quantity) tuples.
+    :param nonlands: A list of nonland card JSONs, one copy each.
+    :return: The deck JSON.
+    """
+    colours = sorted(set(colour for commander in commanders for colour in commander['color_identity']))
+    deck = {'commanders': {commander['name']: {'card': commander} for commander in commanders}, 'mainboard': {}}
+    for card, quantity in list(lands) + [(nonland, 1) for nonland in nonlands]:
+        deck['mainboard'][card['name']] = {'quantity': quantity, 'card': card}
+
+    size = sum(entry['quantity'] for entry in deck['mainboard'].values())
+    for index in range(0, MAINBOARD_SIZE - size):
+        colour = colours[index % len(colours)] if colours else 'C'
+        mana_value = 1 + index % 6
+        spell = card_json(f'{colour} Spell {index}', 'Creature', [colour] if colours else [], '',
+                          f'{{{mana_value - 1}}}{{{colour}}}', mana_value)
+        deck['mainboard'][spell['name']] = {'quantity': 1, 'card': spell}
+    return deck
+
+
+def mono_deck() -> dict:
+    """
+    A mono red deck of basics with a three mana commander.
+    :return: The deck JSON.
+    """
+    commander = card_json('Mono Commander', 'Legendary Creature', ['R'], '', '{1}{R}{R}', 3)
+    return deck_json([commander], [(basic_json('R'), 36)], ramp_jsons('R'))
+
+
+def two_colour_deck() -> dict:
+    """
+    A green and white deck of basics, shocks and taplands with a four mana commander.
+    :return: The deck JSON.
+    """
+    commander = card_json('Two Colour Commander', 'Legendary Creature', ['G', 'W'], '', '{2}{G}{W}', 4)
+    lands = [(basic_json('G'), 14), (basic_json('W'), 13), (dual_json('GW'), 1), (tapland_json('GW'), 3),
+             (card_json('Command Tower', 'Land', [],
+                        "{T}: Add one mana of any color in your commander's color identity."), 1)]
+    return deck_json([commander], lands, ramp_jsons('G'))
+
+
+def five_colour_deck() -> dict:
+    """
+    A five colour deck with a commander that needs every colour.
+    :return: The deck JSON.
+    """
+    commander = card_json('Five Colour Commander', 'Legendary Creature', ['W', 'U', 'B', 'R', 'G'], '',
+                          '{W}{U}{B}{R}{G}', 5)
+    lands = [(basic_json(colour), 3) for colour in 'WUBRG']
+    lands += [(dual_json(pair), 1) for pair in ('WU', 'UB', 'BR', 'RG', 'GW', 'WB', 'UR', 'BG', 'RW', 'GU')]
+    lands += [(tapland_json(pair), 1) for pair in ('WU', 'UB', 'BR', 'RG', 'GW')]
+    lands += [(card_json(name, 'Land', [], '{T}: Add one mana of any color.'), 1)
+              for name in ('City of Brass', 'Mana Confluence', 'Exotic Orchard', 'Reflecting Pool', 'Forbidden Orchard',
+                           'Tarnished Citadel', 'Gemstone Mine', 'Grand Coliseum')]
+    lands.append((card_json('Command Tower', 'Land', [],
+                            "{T}: Add one mana of any color in your commander's color identity."), 1))
+    return deck_json([commander], lands, ramp_jsons('G'))
+
+
+def heavy_fetch_deck() -> dict:
+    """
+    A blue and black deck that plays many fetch lands.
+    :return: The deck JSON.
+    """
+    commander = card_json('Fetch Commander', 'Legendary Creature', ['U', 'B'], '', '{1}{U}{B}', 3)
+    lands = [(basic_json('U'), 10), (basic_json('B'), 10), (dual_json('UB'), 1)]
+    lands += [(fetch_json(pair), 1) for pair in ('UB', 'WU', 'BR', 'UR', 'WB', 'BG', 'GU', 'RW')]
+    lands.append((card_json('Evolving Wilds', 'Land', [],
+                            '{T}, Sacrifice Evolving Wilds: Search your library for a basic land card, put it '
+                            'onto the battlefield tapped, then shuffle.'), 1))
+    return deck_json([commander], lands, ramp_jsons('B'))
+
+
+def partners_deck() -> dict:
+    """
+    A red, white and blue deck with two partner commanders.
+    :return: The deck JSON.
+    """
+    commanders = [card_json('First Partner', 'Legendary Creature', ['R', 'W'], 'Partner', '{1}{R}{W}', 3),
+                  card_json('Second Partner', 'Legendary Creature', ['U'], 'Partner', '{2}{U}', 3)]
+    lands = [(basic_json(colour), 9) for colour in 'RWU']
+    lands += [(dual_json(pair), 1) for pair in ('RW', 'WU', 'UR')]
+    lands += [(tapland_json(pair), 1) for pair in ('RW', 'WU')]
+    lands += [(card_json(name, 'Land', [], '{T}: Add one mana of any color.'), 1)
+              for name in ('City of Brass', 'Mana Confluence', 'Exotic Orchard')]
+    lands.append((card_json('Command Tower', 'Land', [],
+                            "{T}: Add one mana of any color in your commander's color identity."), 1))
+    return deck_json(commanders, lands, ramp_jsons('R'))
+
+
+# Synthetic decks by name
+SYNTHETIC_DECKS = {'mono': mono_deck, 'two_colour': two_colour_deck, 'five_colour': five_colour_deck,
+                   'heavy_fetch': heavy_fetch_deck, 'partners': partners_deck}
@@ -0,0 +1,98 @@
+"""Tests of the deck cache against a local stub of the Moxfield API."""
+
+import http.server
+import json
+import threading
+
+import pytest
+
+import func.moxfield as moxfield
+from func.cache import DeckCache
+
+
+class StubMoxfield(http.server.BaseHTTPRequestHandler):
+    """
+    Serves the server's deck JSON with its ETag and answers 304 when the client's ETag matches.
+    """
+    def do_GET(self):
+        self.server.requests.append(self.headers.get('If-None-Match'))
+        etag = self.server.etag
+        if etag and self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = json.dumps(self.server.deck).encode('utf-8')
+        self.send_response(200)
+        if etag:
+            self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(moxfield, 'cached_user_agent', lambda: 'test')
+    monkeypatch.setattr(moxfield.time, 'sleep', lambda seconds: None)
+    stub = http.server.HTTPServer(('127.0.0.1', 0), StubMoxfield)
+    stub.requests = []
+    stub.etag = '"v1"'
+    stub.deck = {'publicId': 'abc', 'commanders': {'A': {}}, 'lastUpdatedAtUtc': '2026-01-01T00:00:00'}
+    thread = threading.Thread(target=stub.serve_forever, daemon=True)
+    thread.start()
+    yield stub
+    stub.shutdown()
+    stub.server_close()
+
+
+def fetch(server, cache: DeckCache) -> dict:
+    api_url = f'http://127.0.0.1:{server.server_port}/'
+    return moxfield.Moxfield('https://www.moxfield.com/decks/abc', cache=cache, api_url=api_url).moxfield_json
+
+
+def test_fresh_hit_skips_the_request(server, tmp_path):
+    cache = DeckCache(str(tmp_path))
+    assert fetch(server, cache) == server.deck
+    assert fetch(server, cache) == server.deck
+    assert server.requests == [None]
+
+
+def test_stale_entry_is_revalidated_with_its_etag(server, tmp_path):
+    cache = DeckCache(str(tmp_path), ttl=0)
+    deck = fetch(server, cache)
+    server.deck = {**server.deck, 'changed': True}
+
+    assert fetch(server, cache) == deck
+    assert server.requests == [None, '"v1"']
+
+
+def test_unchanged_last_update_keeps_the_cached_deck(server, tmp_path):
+    server.etag = None
+    cache = DeckCache(str(tmp_path), ttl=0)
+    deck = fetch(server, cache)
+    server.deck = {**server.deck, 'changed': True}
+
+    assert fetch(server, cache) == deck
+    server.deck = {**server.deck, 'lastUpdatedAtUtc': '2026-02-01T00:00:00'}
+    assert fetch(server, cache) == server.deck
+    assert len(server.requests) == 3
+
+
+def test_least_recently_used_deck_is_evicted(tmp_path):
+    deck_size = len(json.dumps({'publicId': 'a'}, sort_keys=True))
+    with DeckCache(str(tmp_path), max_bytes=2 * deck_size) as cache:
+        cache.store('a', {'publicId': 'a'})
+        cache.store('b', {'publicId': 'b'})
+        assert cache.lookup('a') is not None
+        cache.store('c', {'publicId': 'c'})
+        assert cache.lookup('b') is None
+        assert cache.lookup('a') is not None
+
+    # The use time of the last hit on a, newer than c, was saved on close
+    reopened = DeckCache(str(tmp_path), max_bytes=2 * deck_size)
+    reopened.store('d', {'publicId': 'd'})
+    assert reopened.lookup('c') is None
+    assert reopened.lookup('a') is not None
@@ -0,0 +1,101 @@
+"""Tests of the land behaviour and ramp heuristics on real oracle texts."""
+
+from func.mana import MANA_ORDER
+from func.moxfield import Card, enters_tapped, fetchable_mask, mdfc_land_face, parse_fetch
+from func.synthetic import card_json
+
+POLLUTED_DELTA = card_json('Polluted Delta', 'Land', [],
+                           '{T}, Pay 1 life, Sacrifice Polluted Delta: Search your library for an Island or Swamp '
+                           'card, put it onto the battlefield, then shuffle.')
+EVOLVING_WILDS = card_json('Evolving Wilds', 'Land', [],
+                           '{T}, Sacrifice Evolving Wilds: Search your library for a basic land card, put it onto '
+                           'the battlefield tapped, then shuffle.')
+WATERY_GRAVE = card_json('Watery Grave', 'Land — Island Swamp', ['U', 'B'],
+                         "({T}: Add {U} or {B}.)\nAs Watery Grave enters, you may pay 2 life. "
+                         "If you don't, it enters tapped.")
+DROWNED_CATACOMB = card_json('Drowned Catacomb', 'Land', ['U', 'B'],
+                             'Drowned Catacomb enters tapped unless you control an Island or a Swamp.\n'
+                             '{T}: Add {U} or {B}.')
+DISMAL_BACKWATER = card_json('Dismal Backwater', 'Land', ['U', 'B'],
+                             'Dismal Backwater enters tapped.\nWhen Dismal Backwater enters, you gain 1 life.\n'
+                             '{T}: Add {U} or {B}.')
+ISLAND = card_json('Island', 'Basic Land — Island', ['U'], '({T}: Add {U}.)')
+AGADEEMS_AWAKENING = {
+    **card_json("Agadeem's Awakening // Agadeem, the Undercrypt", 'Sorcery // Land', ['B'], '', '{X}{B}{B}{B}', 3),
+    'layout': 'modal_dfc',
+    'card_faces': [{'name': "Agadeem's Awakening", 'type_line': 'Sorcery', 'mana_cost': '{X}{B}{B}{B}',
+                    'oracle_text': 'Return from your graveyard to the battlefield any number of target creature '
+                                   'cards that each have a different mana value X or less.'},
+                   {'name': 'Agadeem, the Undercrypt', 'type_line': 'Land', 'mana_cost': '',
+                    'oracle_text': "As Agadeem, the Undercrypt enters, you may pay 3 life. If you don't, "
+                                   "it enters tapped.\n{T}: Add {B}."}]}
+DELVER_OF_SECRETS = {
+    **card_json('Delver of Secrets // Insectile Aberration', 'Creature — Human Wizard // Creature — Human Insect',
+                ['U'], '', '{U}', 1),
+    'layout': 'transform'}
+CULTIVATE = card_json('Cultivate', 'Sorcery', ['G'],
+                      'Search your library for up to two basic land cards, reveal those cards, put one onto the '
+                      'battlefield tapped and the other into your hand, then shuffle.', '{2}{G}', 3)
+SKYSHROUD_CLAIM = card_json('Skyshroud Claim', 'Sorcery', ['G'],
+                            'Search your library for up to two Forest cards, put them onto the battlefield, '
+                            'then shuffle.', '{3}{G}', 4)
+
+
+def mask(colours: str) -> int:
+    total = 0
+    for colour in colours:
+        total |= 1 << MANA_ORDER.index(colour)
+    return total
+
+
+def test_fetch_land():
+    delta = Card(0, POLLUTED_DELTA)
+    assert delta.is_fetch() and not delta.enters_tapped
+    assert parse_fetch(POLLUTED_DELTA['oracle_text']) == mask('ub')
+
+    # A fetch finds typed nonbasics, not basics of other types
+    lands = [Card(1, ISLAND), Card(2, WATERY_GRAVE), Card(3, card_json('Mountain', 'Basic Land — Mountain', ['R']))]
+    assert fetchable_mask(delta.fetch_mask, lands) == mask('ub')
+
+
+def test_basic_only_fetch_land_enters_tapped():
+    wilds = Card(0, EVOLVING_WILDS)
+    assert wilds.is_fetch() and wilds.enters_tapped
+    assert wilds.fetch_mask == mask('wubrgc') | 1
+    assert fetchable_mask(wilds.fetch_mask, [Card(1, ISLAND), Card(2, WATERY_GRAVE)]) == mask('u')
+
+
+def test_shock_land():
+    grave = Card(0, WATERY_GRAVE)
+    assert not grave.enters_tapped and not grave.is_fetch()
+    assert grave.land_types == mask('ub')
+    assert grave.mana_produced_mask == mask('ub')
+
+
+def test_check_land_and_tapland():
+    assert not enters_tapped(DROWNED_CATACOMB['oracle_text'])
+    assert enters_tapped(DISMAL_BACKWATER['oracle_text'])
+    assert Card(0, DISMAL_BACKWATER).enters_tapped
+    assert Card(1, ISLAND).land_types == mask('u') | 1
+
+
+def test_mdfc_land_face():
+    assert mdfc_land_face(AGADEEMS_AWAKENING)['name'] == 'Agadeem, the Undercrypt'
+    agadeem = Card(0, AGADEEMS_AWAKENING)
+    assert agadeem.card_category == 'land' and not agadeem.enters_tapped
+    assert agadeem.mana_produced_mask == mask('b')
+
+    # Transforming cards can't be played by their back face
+    assert mdfc_land_face(DELVER_OF_SECRETS) is None
+    assert Card(1, DELVER_OF_SECRETS).card_category == 'nonland'
+
+
+def test_basic_search_spells():
+    cultivate = Card(0, CULTIVATE)
+    assert cultivate.ramp_kind == 'land search'
+    assert (cultivate.ramp_amount, cultivate.ramp_delay) == (1, 1)
+    assert cultivate.ramp_mask == mask('wubrgc')
+
+    claim = Card(1, SKYSHROUD_CLAIM)
+    assert claim.ramp_kind == 'land search'
+    assert (claim.ramp_mask, claim.ramp_amount, claim.ramp_delay) == (mask('g'), 2, 0)
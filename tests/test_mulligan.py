@@ -0,0 +1,25 @@
+"""Tests of the mulligan policies."""
+
+import random
+
+import pytest
+
+from func.mulligan import OPENING_HAND_SIZE, MulliganPolicy
+
+
+@pytest.mark.parametrize('london', [True, False])
+def test_mulligans_that_leave_no_cards_are_rejected(london):
+    with pytest.raises(ValueError):
+        MulliganPolicy(max_mulligans=OPENING_HAND_SIZE, london=london)
+    with pytest.raises(ValueError):
+        MulliganPolicy(max_mulligans=-1, london=london)
+    MulliganPolicy(max_mulligans=OPENING_HAND_SIZE, london=london, free_first=True)
+
+
+def test_last_traditional_mulligan_keeps_one_card():
+    # Only nonlands, so every hand is mulliganed until the last mulligan keeps it whatever it has
+    policy = MulliganPolicy(min_lands=1, max_mulligans=OPENING_HAND_SIZE - 1, london=False)
+    library = tuple([-1] * 60)
+    hand, rest = policy.keep_hand(library, random.Random(1))
+    assert len(hand) == 1
+    assert len(rest) == len(library) - 1
@@ -0,0 +1,19 @@
+"""Tests of the land mix optimisation."""
+
+from func.moxfield import Card, DeckList
+from func.optimise import optimise_land_mix
+from func.synthetic import fetch_json, partners_deck
+
+
+def test_fetch_candidates_only_find_the_decks_lands():
+    decklist = DeckList(deck_json=partners_deck())
+    dead_fetch = Card(1000, fetch_json('BG'))
+    useful_fetch = Card(1001, fetch_json('WU'))
+
+    result = optimise_land_mix(decklist, [dead_fetch, useful_fetch], 1, exact=True, workers=1)
+    assert result['swaps'] and result['swaps'][0][1] == useful_fetch.name
+    assert all(candidate != dead_fetch.name for variant in result['variants'] for _, candidate in variant['swaps'])
+
+    result = optimise_land_mix(decklist, [dead_fetch], 1, exact=True, workers=1)
+    assert result['swaps'] == []
+    assert len(result['variants']) == 1
@@ -0,0 +1,36 @@
+"""Tests of the streaming JSON lines pipeline."""
+
+import io
+import json
+
+from func.pipeline import run_pipeline
+from func.synthetic import mono_deck
+
+
+def test_bad_records_become_error_rows():
+    good = json.dumps(mono_deck())
+    lines = [good, good, '[1, 2]', 'null', '', '3', '{not json', good]
+    output = io.StringIO()
+
+    failed = run_pipeline(io.StringIO('\n'.join(lines) + '\n'), output, [0, 0, 0, 0, 0, 0, 0], 'p', workers=1)
+
+    rows = [json.loads(row) for row in output.getvalue().splitlines()]
+    assert failed == 4
+    assert [row['line'] for row in rows] == [0, 1, 2, 3, 5, 6, 7]
+    assert [row['error'] is None for row in rows] == [True, True, False, False, False, False, True]
+    assert all(0 < row['probability'] <= 1 for row in rows if row['error'] is None)
+
+
+def test_records_get_their_own_stable_seeds():
+    good = json.dumps(mono_deck())
+    lines = '\n'.join([good, good, good]) + '\n'
+
+    full = io.StringIO()
+    run_pipeline(io.StringIO(lines), full, [0, 0, 0, 0, 0, 0, 0], 'p', iterations=500, seed=7, workers=1)
+    resumed = io.StringIO()
+    run_pipeline(io.StringIO(lines), resumed, [0, 0, 0, 0, 0, 0, 0], 'p', iterations=500, seed=7, workers=1, start=1)
+
+    full_rows = [json.loads(row) for row in full.getvalue().splitlines()]
+    resumed_rows = [json.loads(row) for row in resumed.getvalue().splitlines()]
+    assert len({row['probability'] for row in full_rows}) > 1
+    assert resumed_rows == full_rows[1:]